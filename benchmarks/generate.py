@@ -0,0 +1,55 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys
+import time
+from gramorpher import Generator, PictCorpus
+from tests.test import get_test_grammar_file_path
+
+UNQL_RULES = [
+    'from_section',
+    'sorting_section',
+    'limit_section',
+    'offset_section',
+    'property_section',
+    'expression_dictionary',
+    'expression_binary_operator',
+    'expression_operator',
+]
+
+def benchmark_generate(grammar_file, rule_names, count):
+    generator = Generator(PictCorpus())
+    generator.parse_grammar_file(get_test_grammar_file_path(grammar_file))
+    start = time.perf_counter()
+    for _ in range(count):
+        for rule_name in rule_names:
+            generator.generate(rule_name)
+    elapsed = time.perf_counter() - start
+    return {
+        'name': 'generate:%s' % grammar_file,
+        'count': count * len(rule_names),
+        'seconds': elapsed,
+        'rate': (count * len(rule_names)) / elapsed,
+    }
+
+def main():
+    count = 20
+    if 1 < len(sys.argv):
+        count = int(sys.argv[1])
+    result = benchmark_generate('UnQL.g4', UNQL_RULES, count)
+    print('%s: %d rules in %.3f sec (%.1f rules/sec)' % (result['name'], result['count'], result['seconds'], result['rate']))
+
+if __name__ == '__main__':
+    main()
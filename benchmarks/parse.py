@@ -0,0 +1,57 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys
+import time
+import multiprocessing
+from gramorpher import Grammar, PredictionCache
+from tests.test import get_test_grammar_file_path
+
+def benchmark_parse(grammar_file, prediction_name, count, warm_up = False):
+    prediction = Grammar.Prediction[prediction_name]
+    if warm_up:
+        PredictionCache.warm_up()
+        prediction_name += ':warm_up'
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        Grammar(prediction).parse_file(grammar_file)
+        times.append(time.perf_counter() - start)
+    warm_times = times[1:] if 1 < len(times) else times
+    return {
+        'name': 'parse:%s:%s' % (grammar_file, prediction_name),
+        'count': count,
+        'cold_seconds': times[0],
+        'warm_seconds': sum(warm_times) / len(warm_times),
+    }
+
+def main():
+    # Additional grammar files such as PostgreSQLParser.g4 can be given as arguments
+    grammar_files = [get_test_grammar_file_path('UnQL.g4'), get_test_grammar_file_path('CSV.g4')]
+    grammar_files.extend(sys.argv[1:])
+    count = 10
+    # Each configuration runs in a fresh process to measure the cold DFA cache too
+    mp_ctx = multiprocessing.get_context('spawn')
+    for grammar_file in grammar_files:
+        for prediction in Grammar.Prediction:
+            with mp_ctx.Pool(1) as pool:
+                result = pool.apply(benchmark_parse, (grammar_file, prediction.name, count))
+            print('%s: cold %.4f sec, warm %.4f sec' % (result['name'], result['cold_seconds'], result['warm_seconds']))
+        with mp_ctx.Pool(1) as pool:
+            result = pool.apply(benchmark_parse, (grammar_file, Grammar.Prediction.SLL_LL.name, count, True))
+        print('%s: cold %.4f sec, warm %.4f sec' % (result['name'], result['cold_seconds'], result['warm_seconds']))
+
+if __name__ == '__main__':
+    main()
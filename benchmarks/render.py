@@ -0,0 +1,71 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys
+import time
+from gramorpher import Generator, PictCorpus
+from tests.test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def benchmark_render(grammar_file, corpus_file, rule_name, count):
+    generator = Generator(PictCorpus())
+    generator.parse_grammar_file(get_test_grammar_file_path(grammar_file))
+    generator.parse_corpus_file(get_test_corpus_file_path(corpus_file))
+    rule = generator.generate(rule_name)
+    cases = generator.corpus.cases
+    case_cnt = len(cases)
+    start = time.perf_counter()
+    for n in range(count):
+        generator.render(rule, cases[n % case_cnt])
+    elapsed = time.perf_counter() - start
+    return {
+        'name': 'render:%s:%s' % (grammar_file, rule_name),
+        'count': count,
+        'seconds': elapsed,
+        'rate': count / elapsed,
+    }
+
+def benchmark_render_batch(grammar_file, corpus_file, rule_name, count, batch_size = 1000):
+    generator = Generator(PictCorpus())
+    generator.parse_grammar_file(get_test_grammar_file_path(grammar_file))
+    generator.parse_corpus_file(get_test_corpus_file_path(corpus_file))
+    rule = generator.generate(rule_name)
+    cases = generator.corpus.cases
+    case_cnt = len(cases)
+    items = [(rule, cases[n % case_cnt]) for n in range(batch_size)]
+    start = time.perf_counter()
+    for _ in range(count // batch_size):
+        generator.renderer.render_batch(items)
+    elapsed = time.perf_counter() - start
+    count = (count // batch_size) * batch_size
+    return {
+        'name': 'render_batch:%s:%s' % (grammar_file, rule_name),
+        'count': count,
+        'seconds': elapsed,
+        'rate': count / elapsed,
+    }
+
+def main():
+    count = 100000
+    if 1 < len(sys.argv):
+        count = int(sys.argv[1])
+    results = [
+        benchmark_render('CSV.g4', 'CSV.pict', 'row', count),
+        benchmark_render_batch('CSV.g4', 'CSV.pict', 'row', count),
+    ]
+    for result in results:
+        print('%s: %d cases in %.3f sec (%.0f cases/sec)' % (result['name'], result['count'], result['seconds'], result['rate']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import sys
+import json
+import tempfile
+from argparse import ArgumentParser
+from .suite import STAGES, benchmark_subject, git_commit
+from .synthetic import synthetic_grammar, synthetic_corpus, synthetic_column_names
+
+# Default parameters of the synthetic grammar and corpus, a sweep overrides one of them
+DEFAULTS = {
+    'rules': 1000,
+    'fan_out': 2,
+    'alt_length': 2,
+    'recursion': 0.0,
+    'nesting': 0,
+    'columns': 10,
+    'rows': 1000,
+}
+DIMENSIONS = sorted(DEFAULTS.keys())
+
+def write_subject(work_dir, params):
+    grammar_file = os.path.join(work_dir, 'Synthetic.g4')
+    token_count = max(params['columns'], params['rules'] // 100)
+    with open(grammar_file, 'w') as file:
+        file.write(synthetic_grammar(params['rules'], params['fan_out'], 0, params['alt_length'], params['recursion'], params['nesting'], token_count))
+    corpus_file = os.path.join(work_dir, 'Synthetic.pict')
+    with open(corpus_file, 'w') as file:
+        file.write(synthetic_corpus(synthetic_column_names(params['columns']), params['rows']))
+    return grammar_file, corpus_file
+
+def sweep(dimension, values, stages = None, repeat = 1):
+    # Runs the stages for each value of the dimension, the other parameters keep the defaults
+    stages = stages if stages else STAGES
+    results = []
+    for value in values:
+        params = dict(DEFAULTS)
+        params[dimension] = value
+        with tempfile.TemporaryDirectory() as work_dir:
+            grammar_file, corpus_file = write_subject(work_dir, params)
+            rule_name = 'r%d' % max(0, params['rules'] - 10)
+            subject = '%s=%s' % (dimension, value)
+            for result in benchmark_subject(subject, grammar_file, rule_name, corpus_file, repeat, stages):
+                result['dimension'] = dimension
+                result['value'] = value
+                result['params'] = params
+                results.append(result)
+    return results
+
+def main(argv = None):
+    arg_parser = ArgumentParser(prog = 'benchmarks.scaling')
+    arg_parser.add_argument('dimension', choices=DIMENSIONS, help='parameter to sweep')
+    arg_parser.add_argument('values', help='comma separated values such as 100,1000,5000')
+    arg_parser.add_argument('-t', '--stage', action='append', choices=STAGES, help='stage name')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=1, help='repeats, the best time is reported')
+    arg_parser.add_argument('-o', '--output', help='JSON result file, stdout by default')
+    args = arg_parser.parse_args(argv)
+
+    value_type = type(DEFAULTS[args.dimension])
+    values = [value_type(value) for value in args.values.split(',')]
+    report = {
+        'commit': git_commit(),
+        'dimension': args.dimension,
+        'results': sweep(args.dimension, values, args.stage, args.repeat),
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    for result in report['results']:
+        print('%-32s %14.1f/sec' % (result['name'], result['rate']), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from argparse import ArgumentParser
+from gramorpher import Grammar, Generator, PictCorpus
+from gramorpher.expander import Expander
+from tests.test import get_test_grammar_file_path, get_test_corpus_file_path
+from .synthetic import synthetic_grammar, synthetic_corpus
+
+# Each entry is (name, grammar file, rule name, corpus file), the synthetic files are written on setup
+SUBJECTS = [
+    ('CSV', get_test_grammar_file_path('CSV.g4'), 'row', get_test_corpus_file_path('CSV.pict')),
+    ('UnQL', get_test_grammar_file_path('UnQL.g4'), 'limit_section', None),
+    ('Synthetic5000', None, 'r4990', None),
+]
+SYNTHETIC_RULE_COUNT = 5000
+SYNTHETIC_CORPUS_ROWS = 1000
+SAMPLE_RULES = 20
+MAX_NODES = 500
+STAGES = ['parse', 'lookup', 'enumeration', 'expansion', 'generate', 'corpus', 'render']
+
+def measure(stage, subject, func, count, repeat):
+    # Returns the best of the repeats like timeit, func runs count operations per call
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return {
+        'name': '%s:%s' % (stage, subject),
+        'stage': stage,
+        'subject': subject,
+        'count': count,
+        'seconds': best,
+        'rate': count / best if 0 < best else 0,
+    }
+
+def setup_synthetic(work_dir):
+    grammar_file = os.path.join(work_dir, 'Synthetic%d.g4' % SYNTHETIC_RULE_COUNT)
+    with open(grammar_file, 'w') as file:
+        file.write(synthetic_grammar(SYNTHETIC_RULE_COUNT))
+    grammar = Grammar()
+    grammar.parse_file(grammar_file)
+    corpus_file = os.path.join(work_dir, 'Synthetic%d.pict' % SYNTHETIC_RULE_COUNT)
+    with open(corpus_file, 'w') as file:
+        file.write(synthetic_corpus(sorted(grammar.lexer_rule_index.keys()), SYNTHETIC_CORPUS_ROWS))
+    return grammar_file, corpus_file
+
+def benchmark_subject(subject, grammar_file, rule_name, corpus_file, repeat, stages):
+    results = []
+    parse_count = 1 if subject.startswith('Synthetic') else 5
+    if 'parse' in stages:
+        def parse():
+            for _ in range(parse_count):
+                Grammar().parse_file(grammar_file)
+        results.append(measure('parse', subject, parse, parse_count, repeat))
+
+    generator = Generator(PictCorpus())
+    generator.parse_grammar_file(grammar_file)
+    if corpus_file is not None:
+        generator.parse_corpus_file(corpus_file)
+    grammar = generator.grammar
+    rule_names = list(grammar.rule_index.keys())
+    sample_names = rule_names[:SAMPLE_RULES]
+
+    if 'lookup' in stages:
+        lookup_count = 10
+        def lookup():
+            for _ in range(lookup_count):
+                for rule_name in rule_names:
+                    grammar.find_rule(rule_name)
+        results.append(measure('lookup', subject, lookup, lookup_count * len(rule_names), repeat))
+
+    if 'enumeration' in stages:
+        # Enumerates the element decompositions of all rules, the first repeat fills the element cache
+        def enumerate_rules():
+            for rule in grammar.rules():
+                rule.elements(True)
+        results.append(measure('enumeration', subject, enumerate_rules, len(rule_names), repeat))
+
+    if 'expansion' in stages:
+        def expand():
+            for rule_name in sample_names:
+                rule = grammar.find_rule(rule_name)
+                Expander(max_depth=0, max_nodes=MAX_NODES).add_children(rule, rule.elements())
+        results.append(measure('expansion', subject, expand, len(sample_names), repeat))
+
+    if 'generate' in stages:
+        def generate():
+            for rule_name in sample_names:
+                generator.generate(rule_name, max_nodes=MAX_NODES)
+        results.append(measure('generate', subject, generate, len(sample_names), repeat))
+
+    if 'corpus' in stages and corpus_file is not None:
+        def load_corpus():
+            PictCorpus().parse_file(corpus_file)
+        row_count = len(generator.corpus.cases)
+        results.append(measure('corpus', subject, load_corpus, row_count, repeat))
+
+    if 'render' in stages:
+        render_count = 20000
+        rule = generator.generate(rule_name)
+        cases = generator.corpus.cases if 0 < len(generator.corpus.cases) else [None]
+        case_cnt = len(cases)
+        def render():
+            for n in range(render_count):
+                generator.render(rule, cases[n % case_cnt])
+        results.append(measure('render', subject, render, render_count, repeat))
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(subjects = None, stages = None, repeat = 3):
+    stages = stages if stages else STAGES
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for subject, grammar_file, rule_name, corpus_file in SUBJECTS:
+            if subjects and subject not in subjects:
+                continue
+            if grammar_file is None:
+                grammar_file, corpus_file = setup_synthetic(work_dir)
+            report['results'].extend(benchmark_subject(subject, grammar_file, rule_name, corpus_file, repeat, stages))
+    return report
+
+def compare(report, base_report):
+    # Prints the rate ratio of each result to the base, above 1.0 is faster
+    base_results = {}
+    for result in base_report['results']:
+        base_results[result['name']] = result
+    for result in report['results']:
+        base = base_results.get(result['name'])
+        if base is None or base['rate'] <= 0:
+            print('%-28s %14.1f/sec %14s' % (result['name'], result['rate'], '-'))
+            continue
+        print('%-28s %14.1f/sec %14.1f/sec %6.2fx' % (result['name'], result['rate'], base['rate'], result['rate'] / base['rate']))
+
+def main():
+    arg_parser = ArgumentParser(prog = 'benchmarks.suite')
+    arg_parser.add_argument('-o', '--output', help='JSON result file, stdout by default')
+    arg_parser.add_argument('-c', '--compare', help='JSON result file of a base commit')
+    arg_parser.add_argument('-s', '--subject', action='append', help='subject name such as CSV, UnQL or Synthetic5000')
+    arg_parser.add_argument('-t', '--stage', action='append', choices=STAGES, help='stage name')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=3, help='repeats, the best time is reported')
+    args = arg_parser.parse_args()
+
+    report = run(args.subject, args.stage, args.repeat)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+
+if __name__ == '__main__':
+    main()
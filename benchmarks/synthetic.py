@@ -0,0 +1,106 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys
+import random
+from argparse import ArgumentParser
+
+SUFFIXES = ['?', '*', '+', '']
+
+def synthetic_grammar(rule_count, fan_out = 2, seed = 0, alt_length = 2, recursion = 0.0, nesting = 0, token_count = 0):
+    # Rule n refers to the next rules, or to itself and the previous rules with the recursion probability.
+    # The non-last alternatives are wrapped in nesting levels of blocks, and the last alternative
+    # has a single forward element to keep the shortest derivations small.
+    r = random.Random(seed)
+    lines = ['grammar Synthetic%d;' % rule_count, '']
+    if token_count <= 0:
+        token_count = max(1, rule_count // 100)
+    for n in range(rule_count):
+        alts = []
+        for alt in range(fan_out):
+            is_last = (alt == (fan_out - 1))
+            elems = []
+            for _ in range(1 if is_last else alt_length):
+                if not is_last and 0 < recursion and r.random() < recursion:
+                    elems.append('r%d' % r.randint(max(0, n - 10), n))
+                    continue
+                ref = r.randint(n + 1, n + 10)
+                if rule_count <= ref:
+                    elems.append('T%d' % r.randrange(token_count))
+                else:
+                    elems.append('r%d' % ref)
+            text = ' '.join(elems)
+            if not is_last:
+                for _ in range(nesting):
+                    text = '(%s)%s' % (text, r.choice(SUFFIXES))
+            alts.append(text)
+        lines.append('r%d : %s ;' % (n, ' | '.join(alts)))
+    lines.append('')
+    for n in range(token_count):
+        lines.append("T%d : 't%d' [a-z]* ;" % (n, n))
+    lines.append('WS : [ \\t\\r\\n]+ -> skip ;')
+    lines.append('')
+    return '\n'.join(lines)
+
+def synthetic_column_names(column_count):
+    return ['T%d' % n for n in range(column_count)]
+
+def synthetic_corpus(column_names, row_count, seed = 0, value_count = 0):
+    # Each column takes value_count distinct values, the row count by default
+    r = random.Random(seed)
+    if value_count <= 0:
+        value_count = row_count
+    lines = ['\t'.join(column_names)]
+    for n in range(row_count):
+        lines.append('\t'.join(['%s_%d' % (name.lower(), r.randrange(value_count)) for name in column_names]))
+    lines.append('')
+    return '\n'.join(lines)
+
+def main(argv = None):
+    arg_parser = ArgumentParser(prog = 'benchmarks.synthetic')
+    sub_parsers = arg_parser.add_subparsers(dest='command')
+    sub_parsers.required = True
+
+    grammar_parser = sub_parsers.add_parser('grammar', help='write a synthetic grammar')
+    grammar_parser.add_argument('-n', '--rules', type=int, default=5000, help='number of parser rules')
+    grammar_parser.add_argument('-a', '--fan-out', type=int, default=2, help='alternatives per rule')
+    grammar_parser.add_argument('-l', '--alt-length', type=int, default=2, help='elements per alternative')
+    grammar_parser.add_argument('-r', '--recursion', type=float, default=0.0, help='probability of a backward or self reference')
+    grammar_parser.add_argument('-d', '--nesting', type=int, default=0, help='nested block levels per alternative')
+    grammar_parser.add_argument('-t', '--tokens', type=int, default=0, help='number of tokens, rules / 100 by default')
+
+    corpus_parser = sub_parsers.add_parser('corpus', help='write a synthetic PICT corpus')
+    corpus_parser.add_argument('-c', '--columns', type=int, default=10, help='number of columns named T0, T1, ...')
+    corpus_parser.add_argument('-n', '--rows', type=int, default=1000, help='number of rows')
+    corpus_parser.add_argument('-v', '--values', type=int, default=0, help='distinct values per column, rows by default')
+
+    for sub_parser in [grammar_parser, corpus_parser]:
+        sub_parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+        sub_parser.add_argument('-o', '--output', help='output file, stdout by default')
+
+    args = arg_parser.parse_args(argv)
+    if args.command == 'grammar':
+        text = synthetic_grammar(args.rules, args.fan_out, args.seed, args.alt_length, args.recursion, args.nesting, args.tokens)
+    else:
+        text = synthetic_corpus(synthetic_column_names(args.columns), args.rows, args.seed, args.values)
+    if args.output is None:
+        sys.stdout.write(text)
+        return 0
+    with open(args.output, 'w') as file:
+        file.write(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,9 +13,40 @@
 # limitations under the License.
 
 from __future__ import absolute_import
+import importlib
 
-from .grammar import Grammar
-from .generator import Generator
 from .corpus import Corpus
-from .symbols import SymbolCase, SymbolCases
+from .symbols import SymbolCase, SymbolCases, SymbolTable
 from .pict import PictCorpus
+from .derivation import Derivation, DerivationTable
+from .instrument import Instrument
+from .progress import Progress
+
+# The modules depending on the generated ANTLR parser and anytree are imported on first use
+# because the parser deserializes its large ATN at import time, so are the frontier, the Bloom filter
+# and the sink importing tempfile, hashlib and gzip.
+_LAZY_ATTRIBUTES = {
+    'Grammar': 'grammar',
+    'Generator': 'generator',
+    'Enumerator': 'enumerator',
+    'FrontierStore': 'frontier',
+    'BloomFilter': 'bloom',
+    'Sink': 'sink',
+    'Synthesizer': 'synthesizer',
+    'Renderer': 'renderer',
+    'Planner': 'planner',
+    'PredictionCache': 'prediction',
+    'Profiler': 'profiler',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+    module = importlib.import_module('.' + module_name, __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_LAZY_ATTRIBUTES.keys()))
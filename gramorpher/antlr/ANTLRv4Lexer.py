@@ -637,8 +637,7 @@ class ANTLRv4Lexer(LexerAdaptor):
 
     def OPT_LBRACE_action(self, localctx:RuleContext , actionIndex:int):
         if actionIndex == 3:
-            pass
-            #handleOptionsLBrace(); 
+            self.handleOptionsLBrace(); 
      
 
 
@@ -44,6 +44,7 @@ class LexerAdaptor(Lexer):
     """
 
     _currentRuleType = Token.INVALID_TYPE
+    _insideOptionsBlock = False
 
     def __init__(self, inp, output):
         Lexer.__init__(self, inp, output)
@@ -71,7 +72,17 @@ class LexerAdaptor(Lexer):
         if len(self._modeStack) > 0:
             self._type = self.ACTION_CONTENT
 
+    def handleOptionsLBrace(self):
+        if self._insideOptionsBlock:
+            self._type = self.BEGIN_ACTION
+            self.pushMode(self.TargetLanguageAction)
+        else:
+            self._type = self.LBRACE
+            self._insideOptionsBlock = True
+
     def emit(self):
+        if self._type == self.OPTIONS:
+            self._insideOptionsBlock = False
         if self._type == self.ID:
             firstChar = self._input.getText(self._tokenStartCharIndex, self._tokenStartCharIndex)
             if firstChar[0].isupper():
@@ -0,0 +1,140 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import math
+import hashlib
+
+class BloomFilter:
+    # A scalable Bloom filter to suppress duplicate cases of unbounded streams. The items are hashed into
+    # 128-bit digests and each digest sets the bits of its k positions by double hashing. A full slice is
+    # followed by a slice of twice the capacity and half the error rate, so the total false positive rate
+    # stays under error_rate. Beyond max_memory bytes the last slice is filled over its capacity and
+    # its false positive rate grows, i.e. more unique cases are dropped, but no duplicate passes.
+    ERROR_RATE = 0.001
+    CAPACITY = 1 << 20
+    MAX_MEMORY = 64 * 1024 * 1024
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, error_rate = ERROR_RATE, capacity = CAPACITY, max_memory = MAX_MEMORY):
+        if not 0 < error_rate < 1:
+            raise BloomFilter.Error('Error rate (%s) is not in (0, 1)' % error_rate)
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.max_memory = max_memory
+        self.slices = []
+        self.count = 0
+        self.duplicate_count = 0
+        self.is_saturated = False
+        self._add_slice()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, item):
+        return self.contains_digest(BloomFilter.digest(item))
+
+    def memory(self):
+        memory = 0
+        for bloom_slice in self.slices:
+            memory += len(bloom_slice.bits)
+        return memory
+
+    def add(self, item):
+        # Returns False when the item was probably added before
+        return self.add_digest(BloomFilter.digest(item))
+
+    def add_digest(self, digest):
+        h1, h2 = BloomFilter._hashes(digest)
+        for bloom_slice in self.slices:
+            if bloom_slice.contains(h1, h2):
+                self.duplicate_count += 1
+                return False
+        last = self.slices[-1]
+        if last.capacity <= last.count and not self.is_saturated:
+            last = self._add_slice()
+        last.add(h1, h2)
+        self.count += 1
+        return True
+
+    def contains_digest(self, digest):
+        h1, h2 = BloomFilter._hashes(digest)
+        for bloom_slice in self.slices:
+            if bloom_slice.contains(h1, h2):
+                return True
+        return False
+
+    def _add_slice(self):
+        n = len(self.slices)
+        capacity = self.capacity * (BloomFilter.GROWTH ** n)
+        error_rate = self.error_rate * (1 - BloomFilter.TIGHTENING) * (BloomFilter.TIGHTENING ** n)
+        bloom_slice = BloomFilter.Slice(capacity, error_rate)
+        if self.slices and self.max_memory < self.memory() + len(bloom_slice.bits):
+            self.is_saturated = True
+            return self.slices[-1]
+        self.slices.append(bloom_slice)
+        return bloom_slice
+
+    @staticmethod
+    def digest(item):
+        # item is str or a bytes-like object, the digest is stable across processes unlike hash()
+        if isinstance(item, str):
+            item = item.encode('utf-8')
+        return hashlib.blake2b(item, digest_size=16).digest()
+
+    @staticmethod
+    def _hashes(digest):
+        # The first hash is the first position and the second one is the step to the next positions
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+    class Slice:
+        def __init__(self, capacity, error_rate):
+            bit_count = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            self.bit_count = max(8, bit_count)
+            self.hash_count = max(1, int(round(self.bit_count / capacity * math.log(2))))
+            self.bits = bytearray((self.bit_count + 7) // 8)
+            self.capacity = capacity
+            self.count = 0
+
+        def contains(self, h1, h2):
+            # Stops at the first clear bit, which is the common case of a new item
+            bits = self.bits
+            bit_count = self.bit_count
+            h1 %= bit_count
+            h2 = h2 % bit_count or 1
+            for _ in range(self.hash_count):
+                if not bits[h1 >> 3] & (1 << (h1 & 7)):
+                    return False
+                h1 += h2
+                if bit_count <= h1:
+                    h1 -= bit_count
+            return True
+
+        def add(self, h1, h2):
+            bits = self.bits
+            bit_count = self.bit_count
+            h1 %= bit_count
+            h2 = h2 % bit_count or 1
+            for _ in range(self.hash_count):
+                bits[h1 >> 3] |= 1 << (h1 & 7)
+                h1 += h2
+                if bit_count <= h1:
+                    h1 -= bit_count
+            self.count += 1
+
+    class Error(Exception):
+        def __init__(self, msg):
+            self.message = msg
@@ -13,12 +13,14 @@
 # limitations under the License.
 
 from __future__ import absolute_import
-from .symbols import SymbolCases
+from .symbols import SymbolCases, SymbolTable
 
 class Corpus:
-    def __init__(self):
+    def __init__(self, symbol_table = None):
         super().__init__()
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable.default()
         self.names = []
+        self.symbol_ids = frozenset()
         self.cases = SymbolCases()
 
     def add_case(self, s):
@@ -28,7 +30,10 @@ class Corpus:
         return False
 
     def has_symbol(self, name):
-        return False
+        return self.has_symbol_id(self.symbol_table.find_id(name))
+
+    def has_symbol_id(self, symbol_id):
+        return symbol_id in self.symbol_ids
 
     def has_symbols(self, names):
         for name in names:
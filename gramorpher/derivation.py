@@ -0,0 +1,132 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import weakref
+
+class Derivation:
+    # An immutable derivation node, the nodes are hash-consed by DerivationTable and
+    # two derivations are structurally equal only when they are the same object
+    TERMINAL = 1
+    BLOCK = 2
+    EXPANDED = 4
+    RULE = 8
+
+    __slots__ = ('symbol_id', 'name', 'rep', 'flags', 'children', 'size', '__weakref__')
+
+    def __init__(self, symbol_id, name, rep, flags, children):
+        self.symbol_id = symbol_id
+        self.name = name
+        self.rep = rep
+        self.flags = flags
+        self.children = children
+        size = 1
+        for child in children:
+            size += child.size
+        self.size = size
+
+    def __repr__(self):
+        return 'Derivation(%s, %d)' % (self.name, len(self.children))
+
+    def has_repetition(self):
+        if self.rep is not None:
+            return True
+        return False
+
+    def is_terminal(self):
+        if self.flags & Derivation.TERMINAL:
+            return True
+        return False
+
+    def is_blockcontext(self):
+        if self.flags & Derivation.BLOCK:
+            return True
+        return False
+
+    def is_rulespeccontext(self):
+        if self.flags & Derivation.RULE:
+            return True
+        return False
+
+    def is_expanded(self):
+        if self.flags & Derivation.EXPANDED:
+            return True
+        return False
+
+    def is_leaf(self):
+        if 0 < len(self.children):
+            return False
+        return True
+
+    def nodes(self):
+        # Returns the distinct nodes reachable from this node
+        nodes = {}
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if id(node) in nodes:
+                continue
+            nodes[id(node)] = node
+            stack.extend(node.children)
+        return list(nodes.values())
+
+class DerivationTable:
+    def __init__(self):
+        # The nodes are released when no derivation refers them anymore
+        self.nodes = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def intern(self, symbol_id, name, rep = None, flags = 0, children = ()):
+        # The children are interned already, so the key compares them by identity
+        children = tuple(children)
+        key = (symbol_id, rep, flags, children)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Derivation(symbol_id, name, rep, flags, children)
+            self.nodes[key] = node
+        return node
+
+    def add(self, ctx):
+        # Converts a context tree bottom-up without recursion, identical subtrees become one node
+        nodes = [(ctx, False)]
+        results = []
+        while nodes:
+            node, is_visited = nodes.pop()
+            children = node.children
+            if children and not is_visited:
+                nodes.append((node, True))
+                for child in reversed(children):
+                    nodes.append((child, False))
+                continue
+            child_cnt = len(children)
+            derived_children = ()
+            if 0 < child_cnt:
+                derived_children = tuple(results[-child_cnt:])
+                del results[-child_cnt:]
+            flags = 0
+            if node.is_terminal():
+                flags |= Derivation.TERMINAL
+            if node.is_blockcontext():
+                flags |= Derivation.BLOCK
+            if node.is_expanded():
+                flags |= Derivation.EXPANDED
+            if node.is_rulespeccontext():
+                flags |= Derivation.RULE
+            results.append(self.intern(node.symbol_id, node.name, node.rep, flags, derived_children))
+        return results[0]
+
+    def clear(self):
+        self.nodes.clear()
@@ -0,0 +1,146 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import sys
+from .grammar import Grammar
+from .frontier import FrontierStore
+
+class Enumerator:
+    # Enumerates the sentences of a parser rule breadth-first over the leftmost derivations whose trees
+    # are not deeper than max_depth. The rules are compiled into productions over symbol ids, the blocks
+    # and the EBNF suffixes become productions of synthetic symbols with negative ids. A frontier item
+    # is a pair of the sentential form and the depths of its symbols, the frontier spills to disk
+    # beyond max_memory bytes.
+    MAX_DEPTH = 8
+
+    def __init__(self, grammar, max_depth = MAX_DEPTH, max_memory = FrontierStore.MAX_MEMORY, spill_dir = None, chunk_size = FrontierStore.CHUNK_SIZE):
+        self.grammar = grammar
+        self.max_depth = max_depth
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self.chunk_size = chunk_size
+        self.productions = None
+        self.synthetic_count = 0
+        self.frontier = None
+
+    def compile(self):
+        if self.productions is not None:
+            return self.productions
+        self.productions = {}
+        self.synthetic_count = 0
+        symbol_table = self.grammar.symbol_table
+        for name, rule_spec in self.grammar.rule_index.items():
+            alts = []
+            for labeled_alt in rule_spec.ruleBlock().ruleAltList().labeledAlt():
+                alts.append(self._compile_elements(labeled_alt.alternative().element()))
+            self.productions[symbol_table.intern(name)] = alts
+        return self.productions
+
+    def _compile_elements(self, elements):
+        symbols = []
+        for elem in elements:
+            if elem.actionBlock():
+                continue
+            symbol = None
+            atom = elem.atom()
+            block = elem.ebnf().block() if elem.ebnf() else None
+            if elem.labeledElement():
+                atom = elem.labeledElement().atom()
+                block = elem.labeledElement().block()
+            if atom:
+                template = Grammar.AtomContext(self.grammar, atom).element_template()
+                if template is None:
+                    continue
+                if template.cls is Grammar.Rule:
+                    symbol = self.grammar.symbol_table.intern(template.node.RULE_REF().getText())
+                else:
+                    symbol = self.grammar.symbol_table.intern(template.node.getText())
+            elif block:
+                symbol = self._add_synthetic([self._compile_elements(alt.element()) for alt in block.altList().alternative()])
+            else:
+                continue
+            suffix = elem.ebnfSuffix()
+            if elem.ebnf():
+                suffix = elem.ebnf().blockSuffix()
+            if suffix is not None:
+                symbol = self._compile_repetition(symbol, suffix.getText()[0])
+            symbols.append(symbol)
+        return tuple(symbols)
+
+    def _compile_repetition(self, symbol, suffix):
+        # The shorter productions come first, x? is (|x), x* is S: (|x S) and x+ is P: (x|x P)
+        if suffix == '?':
+            return self._add_synthetic([(), (symbol,)])
+        repeat = self._add_synthetic([])
+        if suffix == '*':
+            self.productions[repeat] = [(), (symbol, repeat)]
+        else:
+            self.productions[repeat] = [(symbol,), (symbol, repeat)]
+        return repeat
+
+    def _add_synthetic(self, alts):
+        self.synthetic_count += 1
+        symbol = -self.synthetic_count
+        self.productions[symbol] = alts
+        return symbol
+
+    def enumerate(self, name, count = 0):
+        # Yields the sentences as tuples of terminal symbol names, 0 means all sentences within max_depth
+        productions = self.compile()
+        symbol_id = self.grammar.symbol_table.find_id(name)
+        if symbol_id not in productions:
+            raise Enumerator.Error('Rule (%s) is not found' % name)
+        names = self.grammar.symbol_table.names
+        max_depth = self.max_depth
+        yield_cnt = 0
+        self.frontier = FrontierStore(self.max_memory, self.spill_dir, self.chunk_size, Enumerator._item_size)
+        with self.frontier as frontier:
+            frontier.push(((symbol_id,), (0,)))
+            while 0 < len(frontier):
+                symbols, depths = frontier.pop()
+                index = Enumerator._leftmost_nonterminal(symbols, productions)
+                if index < 0:
+                    yield tuple([names[symbol] for symbol in symbols])
+                    yield_cnt += 1
+                    if 0 < count and count <= yield_cnt:
+                        return
+                    continue
+                depth = depths[index] + 1
+                if 0 < max_depth and max_depth < depth:
+                    continue
+                prefix = symbols[:index]
+                suffix = symbols[index + 1:]
+                depth_prefix = depths[:index]
+                depth_suffix = depths[index + 1:]
+                for alt in productions[symbols[index]]:
+                    frontier.push((prefix + alt + suffix, depth_prefix + (depth,) * len(alt) + depth_suffix))
+
+    @staticmethod
+    def _leftmost_nonterminal(symbols, productions):
+        for index, symbol in enumerate(symbols):
+            if symbol in productions:
+                return index
+        return -1
+
+    @staticmethod
+    def _item_size(item):
+        # The symbols are shared ints, so the tuples are the memory of an item
+        symbols, depths = item
+        return sys.getsizeof(item) + sys.getsizeof(symbols) + sys.getsizeof(depths)
+
+    class Error(Exception):
+        def __init__(self, msg):
+            self.message = msg
@@ -13,29 +13,348 @@
 # limitations under the License.
 
 from __future__ import absolute_import
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+from collections import deque
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from .grammar import Grammar
 from .generator import Generator
+from .synthesizer import Synthesizer
+from .enumerator import Enumerator
+from .prediction import PredictionCache
+from .pict import PictCorpus
+from .profiler import Profiler
+from .progress import Progress
+from .bloom import BloomFilter
+from .sink import Sink
 
-def info(grammer_file, rule_name):
+FORMATS = ['text', 'jsonl']
+BATCH_SIZE = Generator.BATCH_SIZE
+
+def info(grammar_file, rule_name = None):
     generator = Generator()
-    if not generator.parse_grammar_file(grammer_file):
-        return
+    if not generator.parse_grammar_file(grammar_file):
+        return False
+    if rule_name is None:
+        for rule in generator.grammar.rules():
+            print(rule.name)
+        return True
     rule = generator.find_rule(rule_name)
     print(str(rule))
+    return True
+
+class Session:
+    # Loads the grammar and the corpus once, the batches are rendered in the process of the session
+    def __init__(self, grammar_file, corpus_file, rule_name, pairwise = False, format = 'text', derivation_count = Generator.DERIVATION_COUNT):
+        self.generator = Generator(PictCorpus())
+        if not self.generator.parse_grammar_file(grammar_file):
+            raise Generator.Error('Grammar (%s) is not loaded' % grammar_file)
+        if corpus_file is not None and not self.generator.parse_corpus_file(corpus_file):
+            raise Generator.Error('Corpus (%s) is not loaded' % corpus_file)
+        self.rule_name = rule_name
+        self.pairwise = pairwise
+        self.format = format
+        self.derivation_count = derivation_count
+        self.progress = None
+
+    def item_count(self, seed):
+        # The number of the cases planned for the first batch, i.e. one round of its plan
+        return len(self.plan_batch(seed, 0))
+
+    def plan_batch(self, seed, index):
+        items = self.generator.plan_batch(self.rule_name, index, seed, self.pairwise, self.derivation_count)
+        if self.progress is not None:
+            self.generator.add_progress_derivations(self.progress, items)
+        return items
+
+    def render_batch(self, fp, seed, index, begin, end):
+        # Each batch reseeds the synthesizer and plans its own derivations, so the output does not
+        # depend on the number of jobs
+        items = self.plan_batch(seed, index)
+        batch_items = Generator.batch_items(items, end - begin)
+        if self.format == 'text':
+            return self.generator.renderer.write(fp, batch_items)
+        derivation_ids = self.derivation_ids(index, items)
+        case_seed = Generator.batch_seed(seed, index)
+        lines = []
+        for n, (rule, case) in zip(range(begin, end), batch_items):
+            lines.append(self.json_line(n, derivation_ids[rule], case, case_seed, self.generator.render(rule, case)))
+        lines.append('')
+        data = '\n'.join(lines).encode('utf-8')
+        fp.write(data)
+        return len(data)
+
+    def render_digest_batch(self, seed, index, begin, end):
+        # Renders the batch with the byte range and the digest of the text of each case,
+        # the duplicates are dropped by write_unique() in the writing process
+        items = self.plan_batch(seed, index)
+        batch_items = Generator.batch_items(items, end - begin)
+        data = bytearray()
+        entries = []
+        if self.format == 'text':
+            separator = self.generator.renderer.case_separator
+            for view in self.generator.renderer.render_batch(batch_items):
+                offset = len(data)
+                data += view
+                data += separator
+                entries.append((offset, len(data), BloomFilter.digest(view)))
+            return bytes(data), entries
+        derivation_ids = self.derivation_ids(index, items)
+        case_seed = Generator.batch_seed(seed, index)
+        for n, (rule, case) in zip(range(begin, end), batch_items):
+            text = self.generator.render(rule, case)
+            offset = len(data)
+            data += (self.json_line(n, derivation_ids[rule], case, case_seed, text) + '\n').encode('utf-8')
+            entries.append((offset, len(data), BloomFilter.digest(text)))
+        return bytes(data), entries
+
+    def render_texts(self, seed, index, begin, end):
+        items = self.plan_batch(seed, index)
+        return [self.generator.render(rule, case) for rule, case in Generator.batch_items(items, end - begin)]
+
+    def derivation_ids(self, index, items):
+        # The derivations are numbered in the plan order of each batch, which is the same in every process
+        derivation_ids = {}
+        for rule, _ in items:
+            derivation_ids.setdefault(rule, index * self.derivation_count + len(derivation_ids))
+        return derivation_ids
+
+    def json_line(self, index, derivation_id, case, seed, text):
+        # seed is the seed of the batch and row is the corpus values of the case
+        return json.dumps({
+            'rule': self.rule_name,
+            'index': index,
+            'seed': seed,
+            'derivation': derivation_id,
+            'row': case,
+            'text': text,
+        })
+
+def batch_ranges(count, batch_size):
+    index = 0
+    for begin in range(0, count, batch_size):
+        yield index, begin, min(begin + batch_size, count)
+        index += 1
+
+_worker_session = None
 
-def main():
+def _init_worker(grammar_file, corpus_file, rule_name, pairwise, format, derivation_count):
+    global _worker_session
+    _worker_session = Session(grammar_file, corpus_file, rule_name, pairwise, format, derivation_count)
+
+def _render_worker_batch(seed, index, begin, end):
+    fp = io.BytesIO()
+    _worker_session.render_batch(fp, seed, index, begin, end)
+    return fp.getvalue()
+
+def _render_worker_digest_batch(seed, index, begin, end):
+    return _worker_session.render_digest_batch(seed, index, begin, end)
+
+def _render_worker_texts(seed, index, begin, end):
+    return _worker_session.render_texts(seed, index, begin, end)
+
+def _worker_item_count(seed):
+    return _worker_session.item_count(seed)
+
+def write_unique(fp, data, entries, dedup):
+    # Writes the cases whose digests are new to the filter and returns (case count, written bytes)
+    view = memoryview(data)
+    unique = bytearray()
+    case_cnt = 0
+    for begin, end, digest in entries:
+        if dedup.add_digest(digest):
+            unique += view[begin:end]
+            case_cnt += 1
+    fp.write(unique)
+    return case_cnt, len(unique)
+
+def generate(grammar_file, rule_name, corpus_file = None, count = 0, seed = None, jobs = 1, format = 'text', output = None, batch_size = BATCH_SIZE, pairwise = False, profiler = None, progress = None, dedup = None, derivation_count = Generator.DERIVATION_COUNT):
+    # Streams the rendered cases to the output in batches and returns (case count, written bytes, elapsed seconds).
+    # The profiler traces the load and generate stages of this process only, not of the workers.
+    # The progress counts the cases per batch written to the output, the coverage is of the derivations of
+    # this process, i.e. of the first batch only with workers.
+    # dedup is a BloomFilter, the probable duplicates are dropped and the case count excludes them.
+    # output is a file name, a Sink or None for stdout, the given Sink is flushed but not closed.
+    profiler = profiler if profiler is not None else Profiler()
+    start = time.perf_counter()
+    with profiler.stage('load'):
+        session = Session(grammar_file, corpus_file, rule_name, pairwise, format, derivation_count)
+    session.progress = progress
+    if count <= 0:
+        count = session.item_count(seed)
+    elif progress is not None and 1 < jobs:
+        session.plan_batch(seed, 0)
+    fp = output if isinstance(output, Sink) else Sink(output)
+    case_cnt = 0
+    written = 0
+    try:
+        with profiler.stage('generate'):
+            if jobs <= 1:
+                for index, begin, end in batch_ranges(count, batch_size):
+                    if dedup is None:
+                        written += session.render_batch(fp, seed, index, begin, end)
+                        case_cnt += end - begin
+                    else:
+                        data, entries = session.render_digest_batch(seed, index, begin, end)
+                        batch_case_cnt, batch_written = write_unique(fp, data, entries, dedup)
+                        case_cnt += batch_case_cnt
+                        written += batch_written
+                    if progress is not None:
+                        progress.case_count += end - begin
+            else:
+                # The workers hash the cases and this process keeps the only filter
+                worker = _render_worker_batch if dedup is None else _render_worker_digest_batch
+                with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(grammar_file, corpus_file, rule_name, pairwise, format, derivation_count)) as executor:
+                    # At most 2 batches per job are in flight, so the memory does not grow with the count
+                    futures = deque()
+                    for index, begin, end in batch_ranges(count, batch_size):
+                        futures.append((end - begin, executor.submit(worker, seed, index, begin, end)))
+                        if len(futures) < 2 * jobs:
+                            continue
+                        batch_case_cnt, batch_written = _write_result(fp, futures.popleft(), dedup, progress)
+                        case_cnt += batch_case_cnt
+                        written += batch_written
+                    while futures:
+                        batch_case_cnt, batch_written = _write_result(fp, futures.popleft(), dedup, progress)
+                        case_cnt += batch_case_cnt
+                        written += batch_written
+            fp.flush()
+    finally:
+        if fp is not output:
+            fp.close()
+    return case_cnt, written, time.perf_counter() - start
+
+def _write_result(fp, item, dedup, progress):
+    # Writes the result of a worker and returns (case count, written bytes)
+    case_cnt, future = item
+    if dedup is None:
+        data = future.result()
+        fp.write(data)
+        result = (case_cnt, len(data))
+    else:
+        data, entries = future.result()
+        result = write_unique(fp, data, entries, dedup)
+    if progress is not None:
+        progress.case_count += case_cnt
+    return result
+
+async def aiter_cases(grammar_file, rule_name, corpus_file = None, count = 0, seed = None, jobs = 1, batch_size = BATCH_SIZE, pairwise = False, max_batches = 0, derivation_count = Generator.DERIVATION_COUNT):
+    # Renders the batches in worker processes and yields the texts of the cases in order:
+    #   async for text in aiter_cases('UnQL.g4', 'select_stmt', count=100000, seed=1, jobs=4):
+    #       await execute(text)
+    # At most max_batches batches, 2 per job by default, are rendered ahead of the consumer.
+    # The texts are the same as the ones of generate() for the same seed. A single job renders
+    # in a thread of this process by Generator.aiter_cases().
+    if max_batches <= 0:
+        max_batches = 2 * jobs
+    loop = asyncio.get_running_loop()
+    if jobs <= 1:
+        session = await loop.run_in_executor(None, Session, grammar_file, corpus_file, rule_name, pairwise, 'text', derivation_count)
+        texts = session.generator.aiter_cases(rule_name, count, pairwise, batch_size=batch_size, max_batches=max_batches, seed=seed, derivation_count=derivation_count)
+        try:
+            async for text in texts:
+                yield text
+        finally:
+            await texts.aclose()
+        return
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(grammar_file, corpus_file, rule_name, pairwise, 'text', derivation_count))
+    futures = deque()
+    try:
+        if count <= 0:
+            count = await loop.run_in_executor(executor, _worker_item_count, seed)
+        ranges = batch_ranges(count, batch_size)
+        for index, begin, end in ranges:
+            futures.append(loop.run_in_executor(executor, _render_worker_texts, seed, index, begin, end))
+            if len(futures) < max_batches:
+                continue
+            for text in await futures.popleft():
+                yield text
+        while futures:
+            for text in await futures.popleft():
+                yield text
+    finally:
+        # The batches in the workers are finished off the event loop when the consumer exits early
+        for future in futures:
+            future.cancel()
+        await loop.run_in_executor(None, executor.shutdown)
+
+def main(argv = None):
     arg_parser = ArgumentParser(prog = 'gramorpher')
-    arg_parser.add_argument('command', help='command')
-    arg_parser.add_argument('grammer', help='grammar file')
-    arg_parser.add_argument('rule', help='rule name')
-    args = arg_parser.parse_args()
+    sub_parsers = arg_parser.add_subparsers(dest='command')
+    sub_parsers.required = True
+
+    info_parser = sub_parsers.add_parser('info', help='print the rules or the rule tree')
+    info_parser.add_argument('grammar', help='grammar file')
+    info_parser.add_argument('rule', nargs='?', help='rule name')
+
+    gen_parser = sub_parsers.add_parser('generate', help='generate test cases')
+    gen_parser.add_argument('grammar', help='grammar file')
+    gen_parser.add_argument('rule', help='rule name')
+    gen_parser.add_argument('-c', '--corpus', help='PICT corpus file')
+    gen_parser.add_argument('-n', '--count', type=int, default=0, help='number of cases, 0 means one round of the plan of the first batch')
+    gen_parser.add_argument('-s', '--seed', help='random seed')
+    gen_parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    gen_parser.add_argument('-f', '--format', choices=FORMATS, default='text', help='output format')
+    gen_parser.add_argument('-o', '--output', help='output file, stdout by default')
+    gen_parser.add_argument('-b', '--batch-size', type=int, default=BATCH_SIZE, help='cases per write, each batch plans its own derivations')
+    gen_parser.add_argument('-d', '--derivations', type=int, default=Generator.DERIVATION_COUNT, metavar='COUNT', help='derivations planned per batch')
+    gen_parser.add_argument('--compress', choices=Sink.COMPRESSIONS, help='compression of the output, by the .gz or .zst extension of the output file by default')
+    gen_parser.add_argument('--compress-level', type=int, metavar='LEVEL', help='compression level')
+    gen_parser.add_argument('--max-bytes', type=int, default=0, metavar='BYTES', help='rotate the output file every BYTES uncompressed bytes into NAME-00000.EXT, NAME-00001.EXT, ...')
+    gen_parser.add_argument('--buffer-size', type=int, default=Sink.BUFFER_SIZE, metavar='BYTES', help='write buffer size of the output file')
+    gen_parser.add_argument('--pairwise', action='store_true', help='reduce the corpus rows to a pairwise cover')
+    gen_parser.add_argument('--profile', metavar='PREFIX', help='write cProfile stats to PREFIX.pstats and collapsed stacks to PREFIX.collapsed')
+    gen_parser.add_argument('--trace-memory', action='store_true', help='print the top memory allocators of each stage to stderr')
+    gen_parser.add_argument('--progress', type=float, default=0, metavar='SECONDS', help='report the progress to stderr every SECONDS')
+    gen_parser.add_argument('--dedup', action='store_true', help='drop the duplicate cases with a Bloom filter')
+    gen_parser.add_argument('--dedup-error-rate', type=float, default=BloomFilter.ERROR_RATE, metavar='RATE', help='false positive rate of the Bloom filter, i.e. the rate of unique cases dropped')
+    gen_parser.add_argument('--dedup-memory', type=int, default=BloomFilter.MAX_MEMORY // (1024 * 1024), metavar='MIB', help='memory budget of the Bloom filter in MiB')
 
-    cmd = args.command
-    grammer_file = args.grammer_file
-    rule_name = args.rule_name
+    args = arg_parser.parse_args(argv)
 
-    if cmd == 'info':
-        info(grammer_file, rule_name)
+    try:
+        if args.command == 'info':
+            return 0 if info(args.grammar, args.rule) else 1
+        progress = Progress(args.progress) if 0 < args.progress else None
+        dedup = None
+        if args.dedup:
+            dedup = BloomFilter(args.dedup_error_rate, max_memory=args.dedup_memory * 1024 * 1024)
+        compression = args.compress if args.compress is not None else Sink.find_compression(args.output)
+        sink = Sink(args.output, compression, args.buffer_size, args.max_bytes, args.compress_level)
+        with Profiler(args.profile, args.trace_memory) as profiler:
+            if progress is not None:
+                progress.start()
+            try:
+                with sink:
+                    count, written, elapsed = generate(args.grammar, args.rule, args.corpus, args.count, args.seed, args.jobs, args.format, sink, args.batch_size, args.pairwise, profiler, progress, dedup, args.derivations)
+            finally:
+                if progress is not None:
+                    progress.stop()
+    except (Generator.Error, Grammar.Error, Synthesizer.Error, Enumerator.Error, PredictionCache.Error, BloomFilter.Error, Sink.Error) as e:
+        print(e.message, file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader of the pipeline exited, e.g. head(1)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except OSError as e:
+        # e.g. the grammar, the corpus or the output file is not found
+        print(e, file=sys.stderr)
+        return 1
+    if args.trace_memory:
+        profiler.print_memory_stats()
+    rate = count / elapsed if 0 < elapsed else 0
+    print('%d cases (%d bytes) in %.3f sec (%.1f cases/sec)' % (count, written, elapsed, rate), file=sys.stderr)
+    if dedup is not None:
+        print('%d duplicates dropped' % dedup.duplicate_count, file=sys.stderr)
+    if 0 < args.max_bytes:
+        print('%d files (%s ... %s)' % (len(sink.file_names), sink.file_names[0], sink.file_names[-1]), file=sys.stderr)
+    return 0
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import time
+from collections import deque
+
+class Expander:
+    # Budgets of an expansion, 0 means no limit. Generator.generate() passes its own budgets in.
+    MAX_DEPTH = 30
+    MAX_NODES = 0
+    MAX_TIME = 0
+
+    def __init__(self, max_depth = MAX_DEPTH, max_nodes = MAX_NODES, max_time = MAX_TIME):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.deadline = None
+        if 0 < max_time:
+            self.deadline = time.perf_counter() + max_time
+        self.node_count = 0
+        self.is_truncated = False
+
+    def admits_depth(self, depth):
+        if 0 < self.max_depth and self.max_depth <= depth:
+            self.is_truncated = True
+            return False
+        return True
+
+    def admits_nodes(self, node_cnt):
+        # Counts the nodes in when they fit in the node and time budgets
+        if 0 < self.max_nodes and self.max_nodes < (self.node_count + node_cnt):
+            self.is_truncated = True
+            return False
+        if self.deadline is not None and self.deadline <= time.perf_counter():
+            self.is_truncated = True
+            return False
+        self.node_count += node_cnt
+        return True
+
+    def add_children(self, parent, elems, depth = 0):
+        # Expands the rule references breadth-first with an explicit queue instead of recursion,
+        # the elements deeper than max_depth or beyond max_nodes are not added
+        queue = deque()
+        self._attach(parent, elems, depth, queue)
+        while queue:
+            elem, depth = queue.popleft()
+            if not elem.is_rulespeccontext():
+                continue
+            if elem.is_recursive_definition():
+                continue
+            self._attach(elem, elem.elements(), depth + 1, queue)
+        return parent
+
+    def _attach(self, parent, elems, depth, queue):
+        if len(elems) <= 0:
+            return
+        if not self.admits_depth(depth):
+            return
+        # Blocks are cloned with their elements, which count in the node budget too
+        elem_cnt = 0
+        for elem in elems:
+            elem_cnt += 1
+            if elem.children:
+                elem_cnt += len(elem.descendants)
+        if not self.admits_nodes(elem_cnt):
+            return
+        children = list(parent.children)
+        children.extend(elems)
+        parent.children = children
+        for elem in elems:
+            queue.append((elem, depth))
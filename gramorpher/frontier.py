@@ -0,0 +1,156 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import sys
+import pickle
+import shutil
+import tempfile
+from collections import deque
+
+class FrontierStore:
+    # A FIFO queue of picklable items bounded by an estimated memory budget. The items are kept in
+    # memory until the budget is reached, then the later items are spilled in chunks to a temporary
+    # file and loaded back chunk by chunk when the memory window runs out, so the memory is bounded
+    # by the budget plus a chunk of items:
+    #   head (memory) <- spilled chunks (disk) <- tail (memory, less than chunk_size items)
+    # The file is truncated when all chunks are read, and the unread chunks are moved to a new file
+    # when the read ones take more than half of it, so the file is bounded by twice the spilled items.
+    MAX_MEMORY = 256 * 1024 * 1024
+    CHUNK_SIZE = 4096
+
+    def __init__(self, max_memory = MAX_MEMORY, spill_dir = None, chunk_size = CHUNK_SIZE, item_size = sys.getsizeof):
+        # item_size estimates the memory of an item in bytes, 0 < max_memory
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self.chunk_size = chunk_size
+        self.item_size = item_size
+        self.head = deque()
+        self.head_memory = 0
+        self.tail = []
+        self.tail_memory = 0
+        self.file = None
+        self.chunks = deque()
+        self.write_offset = 0
+        self.spilled_count = 0
+        self.disk_count = 0
+        self.max_disk_size = 0
+        self.rotation_count = 0
+
+    def __len__(self):
+        return len(self.head) + self.disk_count + len(self.tail)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def memory(self):
+        return self.head_memory + self.tail_memory
+
+    def is_spilling(self):
+        if 0 < self.disk_count:
+            return True
+        return False
+
+    def push(self, item):
+        size = self.item_size(item)
+        if not self.tail and self.disk_count <= 0 and self.memory() + size <= self.max_memory:
+            self.head.append(item)
+            self.head_memory += size
+            return
+        # The items after a spilled item stay behind it to keep the order
+        self.tail.append(item)
+        self.tail_memory += size
+        if self.chunk_size <= len(self.tail):
+            self._spill()
+
+    def pop(self):
+        if not self.head:
+            self._refill()
+        item = self.head.popleft()
+        self.head_memory -= self.item_size(item)
+        return item
+
+    def _open_file(self):
+        return tempfile.TemporaryFile(prefix='gramorpher-frontier-', dir=self.spill_dir)
+
+    def _spill(self):
+        if self.file is None:
+            self.file = self._open_file()
+        self.file.seek(self.write_offset)
+        pickle.dump(self.tail, self.file, pickle.HIGHEST_PROTOCOL)
+        offset = self.file.tell()
+        self.chunks.append((self.write_offset, len(self.tail)))
+        self.write_offset = offset
+        self.max_disk_size = max(self.max_disk_size, offset)
+        self.spilled_count += len(self.tail)
+        self.disk_count += len(self.tail)
+        self.tail = []
+        self.tail_memory = 0
+
+    def _refill(self):
+        if self.chunks:
+            offset, item_cnt = self.chunks.popleft()
+            self.file.seek(offset)
+            items = pickle.load(self.file)
+            self.disk_count -= item_cnt
+            if not self.chunks:
+                # All chunks are read, the file is reused from the beginning
+                self.file.seek(0)
+                self.file.truncate()
+                self.write_offset = 0
+            elif self.write_offset < 2 * self.chunks[0][0]:
+                self._rotate()
+        elif self.tail:
+            items = self.tail
+            self.tail = []
+            self.tail_memory = 0
+        else:
+            raise IndexError('pop from an empty frontier')
+        self.head = deque(items)
+        self.head_memory = sum([self.item_size(item) for item in items])
+
+    def _rotate(self):
+        # The pushes keep appending behind the unread chunks, which are copied to the head of a new file
+        read_offset = self.chunks[0][0]
+        file = self._open_file()
+        self.file.seek(read_offset)
+        shutil.copyfileobj(self.file, file)
+        self.file.close()
+        self.file = file
+        self.chunks = deque([(offset - read_offset, item_cnt) for offset, item_cnt in self.chunks])
+        self.write_offset -= read_offset
+        self.rotation_count += 1
+
+    def clear(self):
+        self.head = deque()
+        self.head_memory = 0
+        self.tail = []
+        self.tail_memory = 0
+        self.chunks = deque()
+        self.disk_count = 0
+        self.write_offset = 0
+        if self.file is not None:
+            self.file.seek(0)
+            self.file.truncate()
+
+    def close(self):
+        self.clear()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -13,61 +13,381 @@
 # limitations under the License.
 
 from __future__ import absolute_import
+import time
+import random
+import asyncio
+import threading
 from .grammar import Grammar
+from .expander import Expander
 from .corpus import Corpus
-from anytree import RenderTree
+from .synthesizer import Synthesizer
+from .renderer import Renderer
+from .planner import Planner
+from .derivation import DerivationTable
+from .enumerator import Enumerator
+from .frontier import FrontierStore
+from .instrument import Instrument
 
 class Generator:
-    def __init__(self, corpus = Corpus()):
-        self.grammar = Grammar()
+    # Budgets of a generate() call, 0 means no limit
+    MAX_NODES = 10000
+    MAX_DEPTH = 0
+    MAX_TIME = 0
+    # Upper bound of the repetitions of the * and + elements
+    MAX_REPETITION = 2
+    # Derivations planned per batch, the same seeds derive the same trees in every process
+    DERIVATION_COUNT = 8
+    # Cases per batch, each batch reseeds the synthesizer and plans its own derivations
+    BATCH_SIZE = 1024
+    # Batches ahead of the consumer of aiter_cases()
+    ASYNC_MAX_BATCHES = 4
+
+    def __init__(self, corpus = Corpus(), grammar = None):
+        # The grammar shares the symbol table of the corpus to compare the symbols by id, a loaded grammar
+        # has interned its symbols already, so its table must be the one of the corpus
+        if grammar is None:
+            grammar = Grammar(symbol_table=corpus.symbol_table)
+        elif grammar.symbol_table is not corpus.symbol_table:
+            if grammar.root is not None:
+                raise Generator.Error('Grammar and corpus have different symbol tables')
+            grammar.symbol_table = corpus.symbol_table
+        self.grammar = grammar
         self.corpus = corpus
+        self.synthesizer = Synthesizer()
+        if grammar.root is not None:
+            self.synthesizer.set_grammar(grammar)
+        self.renderer = Renderer(self)
+        self.derivations = DerivationTable()
+        self.instrument = None
+
+    def enable_instrument(self, instrument = None):
+        # Shares one instrument with the grammar and returns it, see Instrument.to_dict()
+        if instrument is None:
+            instrument = Instrument()
+        self.instrument = instrument
+        self.grammar.instrument = instrument
+        return instrument
+
+    def disable_instrument(self):
+        self.instrument = None
+        self.grammar.instrument = None
 
     def parse_grammar_file(self, file_name):
-        return self.grammar.parse_file(file_name)
+        if not self.grammar.parse_file(file_name):
+            return False
+        self.synthesizer.set_grammar(self.grammar)
+        return True
+
+    def reload_grammar(self):
+        # Reloads the modified grammar files and invalidates the caches of the affected rules only
+        names = self.grammar.reload()
+        if names:
+            self.synthesizer.invalidate(names)
+            self.renderer.templates.invalidate(names)
+        return names
 
     def parse_corpus_file(self, file_name):
-        return self.corpus.parse_file(file_name)
+        if self.instrument is None:
+            return self.corpus.parse_file(file_name)
+        with self.instrument.timer('corpus.parse'):
+            return self.corpus.parse_file(file_name)
 
     def find_rule(self, name):
         return self.grammar.find_rule(name)
 
-    def generate(self, name):
-        rule = Generator.Rule(self.find_rule(name))
+    def has_symbol(self, name):
+        if self.corpus.has_symbol(name):
+            return True
+        return self.synthesizer.has_symbol(name)
+
+    def symbol_value(self, name, case = None):
+        # Prefers the corpus value and synthesizes one from the lexer rule otherwise
+        if case is not None:
+            value = case.find_case(name)
+            if value is not None:
+                if self.instrument is not None:
+                    self.instrument.count('symbol_value.corpus')
+                return value
+        if self.synthesizer.has_symbol(name):
+            if self.instrument is not None:
+                self.instrument.count('symbol_value.synthesized')
+            return self.synthesizer.generate(name)
+        raise Generator.Error('Symbol (%s) has no value' % name)
+
+    def derive(self, rule):
+        # Returns the hash-consed derivation of the tree, the same trees return the same node
+        return self.derivations.add(rule)
+
+    def render(self, rule, case = None):
+        return self.renderer.render(rule, case)
+
+    def shape_symbols(self, rule):
+        symbols = []
+        for symbol in self.renderer.template(rule).slots:
+            if symbol in symbols:
+                continue
+            if self.corpus.has_symbol(symbol):
+                symbols.append(symbol)
+        return symbols
+
+    def plan(self, rules, pairwise = False):
+        # Combines derivations with the corpus rows projected onto the symbols each derivation uses
+        planner = Planner(self.corpus, pairwise)
+        shape_symbols = [self.shape_symbols(rule) for rule in rules]
+        return [(rules[n], case) for n, case in planner.plan(shape_symbols)]
+
+    def plan_cases(self, name, pairwise = False, seed = None, derivation_count = DERIVATION_COUNT):
+        # Returns the (derivation, case) pairs of the distinct derivations of derivation_count seeds derived
+        # from seed, a rule without corpus symbols renders one synthesized case per derivation. The context
+        # trees are released and the same derivations are the same interned node.
+        derivations = []
+        for n in range(derivation_count):
+            derivation_seed = n if seed is None else '%s:%d' % (seed, n)
+            derivation = self.derive(self.generate(name, seed=derivation_seed))
+            if derivation not in derivations:
+                derivations.append(derivation)
+        items = self.plan(derivations, pairwise)
+        if len(items) <= 0:
+            items = [(derivation, None) for derivation in derivations]
+        return items
+
+    def plan_batch(self, name, index, seed = None, pairwise = False, derivation_count = DERIVATION_COUNT):
+        # Reseeds the synthesizer and plans new derivations for the batch of the index. The batches do not
+        # depend on each other, so the cases are the same for any number of workers. The derivations of
+        # the batches differ even without a seed.
+        self.synthesizer.seed(Generator.batch_seed(seed, index))
+        derivation_seed = index if seed is None else Generator.batch_seed(seed, index)
+        return self.plan_cases(name, pairwise, derivation_seed, derivation_count)
+
+    @staticmethod
+    def batch_seed(seed, index):
+        if seed is None:
+            return None
+        return '%s:%d' % (seed, index)
+
+    @staticmethod
+    def batch_items(items, count):
+        item_cnt = len(items)
+        return [items[n % item_cnt] for n in range(count)]
+
+    def cases(self, name, count = 0, pairwise = False, progress = None, seed = None, batch_size = BATCH_SIZE, derivation_count = DERIVATION_COUNT):
+        # Yields the planned pairs of the batches until count, 0 means the plan of the first batch.
+        # The batches cycle their own plans, so new derivations are drawn every batch_size cases.
+        index = 0
+        begin = 0
         while True:
-            rule.print()
-            # Confirms all leaf nodes can get the symbols to genarete test cases
-            all_leaf_node_has_symbols = True
-            for _, _, node in RenderTree(rule):
-                #print('%s %s %s' % (node.name, node.is_leaf(), node.is_terminal()))
-                if not node.is_leaf():
-                    continue
-                if node.is_terminal():
-                    continue
-                symbol_name = node.name
-                if not self.corpus.has_symbol(symbol_name):
-                    all_leaf_node_has_symbols = False
-            if all_leaf_node_has_symbols:
-                return rule
-
-            # Expands only a grammar node
-            all_nodes_are_expanded = True
-            for _, _, node in RenderTree(rule):
-                if node.has_children():
-                    continue
-                if node.has_elements():
-                    node.add_children(node.elements(True))
-                    all_nodes_are_expanded = False
-                    break
-
-            # Breaks the loop to raise a generation error when all nodes are expanded and any leaf nodes not has symbols
-            if all_nodes_are_expanded:
+            items = self.plan_batch(name, index, seed, pairwise, derivation_count)
+            if count <= 0:
+                count = len(items)
+            end = min(begin + batch_size, count)
+            if progress is not None:
+                self.add_progress_derivations(progress, items)
+            for item in Generator.batch_items(items, end - begin):
+                if progress is not None:
+                    progress.case_count += 1
+                yield item
+            if count <= end:
+                return
+            index += 1
+            begin = end
+
+    def iter_cases(self, name, count = 0, pairwise = False, progress = None, dedup = None, seed = None, batch_size = BATCH_SIZE, derivation_count = DERIVATION_COUNT):
+        # dedup is a BloomFilter, the probable duplicates are skipped but counted in count
+        items = self.cases(name, count, pairwise, progress, seed, batch_size, derivation_count)
+        if dedup is None:
+            for rule, case in items:
+                yield self.render(rule, case)
+            return
+        for rule, case in items:
+            text = self.render(rule, case)
+            if dedup.add(text):
+                yield text
+
+    async def aiter_cases(self, name, count = 0, pairwise = False, dedup = None, batch_size = BATCH_SIZE, max_batches = ASYNC_MAX_BATCHES, seed = None, derivation_count = DERIVATION_COUNT):
+        # Renders the cases of iter_cases() in a worker thread and yields them to the event loop:
+        #   async for text in generator.aiter_cases('stmt', 100000, seed=1):
+        #       await execute(text)
+        # The texts are the same as the ones of executor.aiter_cases() for the same seed and batch size.
+        # The worker waits while max_batches batches are not consumed yet, and is stopped and joined when
+        # the iteration ends. The generator must not be used by others until then. The defaults are used
+        # for the sizes below 1.
+        if batch_size <= 0:
+            batch_size = Generator.BATCH_SIZE
+        if max_batches <= 0:
+            max_batches = Generator.ASYNC_MAX_BATCHES
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        slots = threading.Semaphore(max_batches)
+        stopped = threading.Event()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop is closed
+                stopped.set()
+
+        def produce():
+            try:
+                batch = []
+                slots.acquire()
+                for text in self.iter_cases(name, count, pairwise, dedup=dedup, seed=seed, batch_size=batch_size, derivation_count=derivation_count):
+                    if stopped.is_set():
+                        return
+                    batch.append(text)
+                    if len(batch) < batch_size:
+                        continue
+                    put((batch, None))
+                    batch = []
+                    slots.acquire()
+                if batch and not stopped.is_set():
+                    put((batch, None))
+                put((None, None))
+            except Exception as e:
+                put((None, e))
+
+        thread = threading.Thread(target=produce, name='gramorpher-aiter-cases')
+        thread.start()
+        try:
+            while True:
+                batch, error = await queue.get()
+                if error is not None:
+                    raise error
+                if batch is None:
+                    return
+                slots.release()
+                for text in batch:
+                    yield text
+        finally:
+            # Wakes the worker waiting for a slot to stop it when the consumer exits early,
+            # the worker finishes its case off the event loop
+            stopped.set()
+            slots.release()
+            await loop.run_in_executor(None, thread.join)
+
+    def add_progress_derivations(self, progress, items):
+        # The derivations are interned, so the same derivation is one key
+        rules = {}
+        for rule, _ in items:
+            rules[rule] = True
+        for rule in rules:
+            progress.add_derivation(rule, len(self.grammar.rule_index))
+
+    def enumerate(self, name, count = 0, max_depth = Enumerator.MAX_DEPTH, max_memory = FrontierStore.MAX_MEMORY, spill_dir = None):
+        # Renders the enumerated sentences of the rule, the tokens without literals are synthesized
+        enumerator = Enumerator(self.grammar, max_depth, max_memory, spill_dir)
+        separator = self.renderer.token_separator()
+        for symbols in enumerator.enumerate(name, count):
+            texts = []
+            for symbol in symbols:
+                text = self.grammar.find_terminal(symbol)
+                if text is None:
+                    text = self.symbol_value(symbol)
+                texts.append(text)
+            yield separator.join(texts)
+
+    def generate(self, name, max_nodes = MAX_NODES, max_depth = MAX_DEPTH, max_time = MAX_TIME, seed = 0):
+        # Derives a sentence of the rule top-down, every rule and block node takes one of its alternatives
+        # and a repeated element is expanded up to once (?), up to MAX_REPETITION times (*) or once up to
+        # MAX_REPETITION times (+). The nodes covered by the corpus are left as the slots of the sentence.
+        # The pending nodes are kept on a stack in reverse preorder, so the tree is not rescanned per expansion.
+        # When a budget runs out, the remaining nodes are closed by their shortest completions.
+        # The choices are seeded, so the same seed derives the same tree.
+        start = time.perf_counter()
+        expander = Expander(max_depth, max_nodes, max_time)
+        choices = random.Random(seed)
+        expansion_cnt = 0
+        rule = Generator.Rule(self.find_rule(name))
+        # The rule node itself counts in the node budget
+        expander.node_count = 1
+        nodes = []
+        if self._is_open(rule):
+            nodes.append((rule, 0))
+        while nodes:
+            node, depth = nodes.pop()
+            if not expander.admits_depth(depth):
+                continue
+            alts = self.grammar.find_alternative_templates(node)
+            children = []
+            for template in alts[int(choices.random() * len(alts))]:
+                for _ in range(Generator._repetition_count(template.rep, choices)):
+                    children.append(template.new_context(self.grammar))
+            if not expander.admits_nodes(len(children)):
                 break
-        #raise Generator.Error('Rule (%s) has no all symbols' % name)
+            node.children = children
+            node.expanded = True
+            expansion_cnt += 1
+            for child in reversed(children):
+                if self._is_open(child):
+                    nodes.append((child, depth + 1))
+        rule.is_truncated = expander.is_truncated
+        if rule.is_truncated:
+            self._close(rule)
+        if self.instrument is not None:
+            self.instrument.add_time('generator.generate', time.perf_counter() - start)
+            self.instrument.count('generator.expansions', expansion_cnt)
+            self.instrument.count('generator.nodes', expander.node_count)
+            if rule.is_truncated:
+                self.instrument.count('generator.truncations')
         return rule
 
+    @staticmethod
+    def _repetition_count(rep, choices):
+        if rep is None:
+            return 1
+        if rep[0] == '?':
+            return int(choices.random() * 2)
+        count = int(choices.random() * (Generator.MAX_REPETITION + 1))
+        if rep[0] == '+':
+            return max(count, 1)
+        return count
+
+    def _is_covered(self, node):
+        if node.is_terminal():
+            return True
+        if self.instrument is not None:
+            self.instrument.count('corpus.lookups')
+        return self.corpus.has_symbol_id(node.symbol_id)
+
+    def _is_open(self, node):
+        # A rule or block node which has no alternative chosen and is not a slot of the corpus
+        if node.expanded or node.children:
+            return False
+        if not node.is_rulespeccontext() and not node.is_blockcontext():
+            return False
+        return not self._is_covered(node)
+
+    def _close(self, rule):
+        # The shortest completions are finite, so every open node is closed even beyond max_nodes.
+        # Only a rule without any finite derivation is left open.
+        completions = self.grammar.shortest_completions()
+        nodes = []
+        stack = [rule]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children)
+            elif self._is_open(node):
+                nodes.append(node)
+        while nodes:
+            node = nodes.pop()
+            if node.is_blockcontext():
+                templates = self.grammar.shortest_block_completion(node)
+            else:
+                templates = completions.get(node.name)
+            if templates is None:
+                continue
+            children = [template.clone(self.grammar) for template in templates]
+            node.children = children
+            node.expanded = True
+            for child in children:
+                if self._is_open(child):
+                    nodes.append(child)
+
     class Rule(Grammar.Rule):
         def __init__(self, rule):
             super().__init__(rule.root, rule.node, rule.parent)
+            self.is_truncated = False
 
     class Error(Exception):
         def __init__(self, msg):
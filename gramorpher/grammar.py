@@ -13,46 +13,628 @@
 # limitations under the License.
 
 from __future__ import absolute_import
-from gramorpher import symbols
+from .symbols import SymbolTable
+from .literal import unquote
+from .expander import Expander
 import os
+import re
+import math
 import sys
+import time
 from enum import Enum
-from antlr4 import InputStream, FileStream, CommonTokenStream, ParserRuleContext
+from concurrent.futures import ProcessPoolExecutor
+from antlr4 import InputStream, FileStream, CommonTokenStream, ParserRuleContext, TerminalNode
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 from .antlr import ANTLRv4Parser, ANTLRv4Lexer
 from anytree import NodeMixin, RenderTree
 
+def _parse_grammar_file(file_name, prediction_name):
+    # Runs in a worker process, the returned tree is detached from the parser to be pickled
+    root = Grammar._parse_stream_root(FileStream(file_name, encoding="utf-8"), Grammar.Prediction[prediction_name])
+    Grammar._detach_tree(root)
+    return root
+
 class Grammar:
-    def __init__(self):
+    COMMENT_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+    IMPORT_PATTERN = re.compile(r'\bimport\s+([\w\s,=]+);')
+    TOKEN_VOCAB_PATTERN = re.compile(r'\btokenVocab\s*=\s*[\'"]?(\w+)')
+
+    def __init__(self, prediction = None, jobs = 1, lib_dirs = None, symbol_table = None):
         self.root = None
+        self.roots = []
+        self.prediction = prediction if prediction is not None else Grammar.Prediction.SLL_LL
+        self.jobs = jobs
+        self.lib_dirs = lib_dirs if lib_dirs is not None else []
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable.default()
+        self.instrument = None
+        self.node_symbols = {}
+        self.local_symbols = {}
+        self.rule_index = {}
+        self.lexer_rule_index = {}
+        self.rule_hashes = {}
+        self.rule_references = {}
+        self.rule_terminals = {}
+        self.element_cache = {}
+        self.completions = None
+        self.completion_costs = {}
+        self.block_completions = {}
+        self.default_separator = ''
+        self.terminals = {}
+        self.terminal_bytes = {}
+        self.terminal_ids = {}
+        self.file_name = None
+        self.file_roots = {}
+        self.file_mtimes = {}
 
     def parse_file(self, file_name):
-        stream = FileStream(file_name, encoding="utf-8")
-        return self._parse_stream(stream)
+        # Parses the grammar file with the grammars imported by it or referred as tokenVocab
+        start = time.perf_counter()
+        file_name = os.path.abspath(file_name)
+        file_names = self._scan_dependent_files(file_name)
+        file_roots = self._parse_files(file_names)
+        self.file_name = file_name
+        result = self._set_roots(self._load_file_roots(file_roots))
+        if self.instrument is not None:
+            self.instrument.add_time('grammar.parse', time.perf_counter() - start)
+        return result
+
+    def _load_file_roots(self, file_roots):
+        root_files = []
+        dep_files = [self.file_name]
+        while dep_files:
+            dep_file = dep_files.pop(0)
+            if dep_file in root_files:
+                continue
+            root_files.append(dep_file)
+            if dep_file not in file_roots:
+                # The dependency was missed by the scan, so it is parsed here
+                file_roots.update(self._parse_files([dep_file]))
+            dep_files.extend(self._find_dependent_files(dep_file, file_roots[dep_file]))
+        self.file_roots = {}
+        self.file_mtimes = {}
+        for root_file in root_files:
+            self.file_roots[root_file] = file_roots[root_file]
+            self.file_mtimes[root_file] = os.path.getmtime(root_file)
+        return [file_roots[root_file] for root_file in root_files]
+
+    def is_modified(self):
+        for file_name, mtime in self.file_mtimes.items():
+            if not os.path.isfile(file_name) or os.path.getmtime(file_name) != mtime:
+                return True
+        return False
+
+    def reload(self):
+        # Reparses only the modified files and returns the names of the changed rules and their dependents
+        if self.file_name is None:
+            raise Grammar.Error('Grammar is not loaded from a file')
+        start = time.perf_counter()
+        file_roots = dict(self.file_roots)
+        modified_files = []
+        for file_name, mtime in self.file_mtimes.items():
+            if not os.path.isfile(file_name):
+                del file_roots[file_name]
+                continue
+            if os.path.getmtime(file_name) != mtime:
+                modified_files.append(file_name)
+        file_roots.update(self._parse_files(modified_files))
+        roots = self._load_file_roots(file_roots)
+        rule_specs = self._rule_specs()
+        self.root = roots[0]
+        self.roots = roots
+        self.node_symbols = {}
+        self._build_index()
+        changed_names = self._update_rules(rule_specs)
+        names = self.dependents(changed_names)
+        # The caches of the unchanged rules of the reparsed files refer to the replaced nodes, so they are dropped too
+        new_rule_specs = self._rule_specs()
+        replaced_names = set([name for name, rule_spec in rule_specs.items() if new_rule_specs.get(name) is not rule_spec])
+        for name in names | replaced_names:
+            self.element_cache.pop(name, None)
+        if replaced_names:
+            self.completions = None
+        if self.instrument is not None:
+            self.instrument.add_time('grammar.reload', time.perf_counter() - start)
+        return names
+
+    def watch(self, interval = 1.0):
+        # Yields the affected rule names whenever the grammar files are modified
+        while True:
+            if self.is_modified():
+                yield self.reload()
+            time.sleep(interval)
 
     def parse_string(self, string):
+        start = time.perf_counter()
+        self.file_name = None
+        self.file_roots = {}
+        self.file_mtimes = {}
         stream = InputStream(string)
-        return self._parse_stream(stream)
+        root = Grammar._parse_stream_root(stream, self.prediction)
+        roots = [root]
+        root_files = []
+        dep_files = self._find_dependent_files(None, root)
+        while dep_files:
+            dep_file = dep_files.pop(0)
+            if dep_file in root_files:
+                continue
+            root_files.append(dep_file)
+            dep_root = self._parse_files([dep_file])[dep_file]
+            roots.append(dep_root)
+            dep_files.extend(self._find_dependent_files(dep_file, dep_root))
+        result = self._set_roots(roots)
+        if self.instrument is not None:
+            self.instrument.add_time('grammar.parse', time.perf_counter() - start)
+        return result
 
     def _parse_stream(self, stream):
+        return self._set_roots([Grammar._parse_stream_root(stream, self.prediction)])
+
+    def _set_roots(self, roots):
+        for root in roots:
+            assert isinstance(root, ANTLRv4Parser.GrammarSpecContext)
+        self.root = roots[0]
+        self.roots = roots
+        self.node_symbols = {}
+        self._build_index()
+        self.rule_hashes = {}
+        self.rule_references = {}
+        self.rule_terminals = {}
+        self.element_cache = {}
+        self._update_rules({})
+        return True
+
+    def _rule_specs(self):
+        rule_specs = dict(self.lexer_rule_index)
+        rule_specs.update(self.rule_index)
+        return rule_specs
+
+    def _update_rules(self, old_rule_specs):
+        # Rehashes the rules whose nodes are replaced, and updates the analyses of the changed rules only
+        changed_names = set()
+        rule_specs = self._rule_specs()
+        for name in old_rule_specs:
+            if name not in rule_specs:
+                changed_names.add(name)
+                del self.rule_hashes[name]
+                del self.rule_references[name]
+                del self.rule_terminals[name]
+        for name, rule_spec in rule_specs.items():
+            if old_rule_specs.get(name) is rule_spec:
+                continue
+            rule_hash = hash(rule_spec.getText())
+            if self.rule_hashes.get(name) == rule_hash:
+                continue
+            changed_names.add(name)
+            self.rule_hashes[name] = rule_hash
+            self.rule_references[name], self.rule_terminals[name] = self._analyze_rule(name, rule_spec)
+        if changed_names:
+            self._merge_terminals()
+            self.default_separator = self._find_separator()
+            self.completions = None
+        return changed_names
+
+    def _analyze_rule(self, name, rule_spec):
+        references = set()
+        terminals = {}
+        if isinstance(rule_spec, ANTLRv4Parser.LexerRuleSpecContext):
+            text = Grammar.LexerRule(self, rule_spec).literal()
+            if text is not None:
+                terminals[name] = text
+        nodes = [rule_spec]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, TerminalNode):
+                token_type = node.symbol.type
+                if token_type == ANTLRv4Parser.RULE_REF or token_type == ANTLRv4Parser.TOKEN_REF:
+                    references.add(node.getText())
+                continue
+            if isinstance(node, ANTLRv4Parser.TerminalContext):
+                if node.STRING_LITERAL() and isinstance(rule_spec, ANTLRv4Parser.ParserRuleSpecContext):
+                    terminals[node.getText()] = unquote(node.STRING_LITERAL().getText())
+            if node.children:
+                nodes.extend(node.children)
+        references.discard(name)
+        return references, terminals
+
+    def _merge_terminals(self):
+        # Pre-renders every literal terminal and literal-only token into lookup tables
+        # EOF closes the input and renders as nothing
+        self.terminals = {'EOF': ''}
+        for terminals in self.rule_terminals.values():
+            self.terminals.update(terminals)
+        self.terminal_bytes = {}
+        self.terminal_ids = {}
+        for name, text in self.terminals.items():
+            self.terminal_bytes[name] = text.encode('utf-8')
+            self.terminal_ids[self.symbol_table.intern(name)] = text
+
+    def _find_separator(self):
+        # The tokens are separated by a space when the lexer skips the whitespaces between them
+        for rule_spec in self.lexer_rule_index.values():
+            text = rule_spec.getText()
+            if 'skip' not in text and 'HIDDEN' not in text:
+                continue
+            if ' ' in text or '\\t' in text:
+                return ' '
+        return ''
+
+    def shortest_completions(self):
+        # Returns the element templates of the shortest derivation of each parser rule to close truncated derivations.
+        # The costs are relaxed with a worklist of the referring rules until they converge.
+        if self.completions is not None:
+            return self.completions
+        rule_alts = {}
+        for name, rule_spec in self.rule_index.items():
+            rule_alts[name] = [self._completion_items(labeled_alt.alternative().element()) for labeled_alt in rule_spec.ruleBlock().ruleAltList().labeledAlt()]
+        referrers = {}
+        for name in rule_alts:
+            for reference in self.references(name):
+                referrers.setdefault(reference, []).append(name)
+        costs = {}
+        names = list(rule_alts.keys())
+        pending = set(names)
+        while names:
+            name = names.pop()
+            pending.discard(name)
+            # The costs are floats, the shortest derivations can grow exponentially with the rule count
+            cost = 1.0 + min([Grammar._items_cost(items, costs) for items in rule_alts[name]])
+            if costs.get(name, math.inf) <= cost:
+                continue
+            costs[name] = cost
+            for referrer in referrers.get(name, []):
+                if referrer in rule_alts and referrer not in pending:
+                    pending.add(referrer)
+                    names.append(referrer)
+        self.completions = {}
+        self.completion_costs = costs
+        self.block_completions = {}
+        for name, alts in rule_alts.items():
+            if name not in costs:
+                # The rule has no finite derivation
+                continue
+            alt = min(alts, key=lambda items: Grammar._items_cost(items, costs))
+            self.completions[name] = Grammar._completion_templates(alt, costs)
+        return self.completions
+
+    def shortest_block_completion(self, ctx):
+        # Returns the element templates of the shortest alternative of the block,
+        # the rule costs and the block cache are built along with the rule completions
+        self.shortest_completions()
+        templates = self.block_completions.get(ctx.node)
+        if templates is None:
+            alts = [self._completion_items(alt.element()) for alt in ctx.node.altList().alternative()]
+            templates = Grammar._completion_templates([('b', alts, None)], self.completion_costs)
+            self.block_completions[ctx.node] = templates
+        return templates
+
+    def _completion_items(self, elements):
+        # Optional elements are dropped, the blocks keep their alternatives to choose the shortest one
+        items = []
+        for elem in elements:
+            if elem.actionBlock():
+                continue
+            suffix = elem.ebnfSuffix()
+            if elem.ebnf():
+                suffix = elem.ebnf().blockSuffix()
+            if suffix is not None and suffix.getText()[0] in '?*':
+                continue
+            atom = elem.atom()
+            block = elem.ebnf().block() if elem.ebnf() else None
+            if elem.labeledElement():
+                atom = elem.labeledElement().atom()
+                block = elem.labeledElement().block()
+            if atom:
+                template = Grammar.AtomContext(self, atom).element_template()
+                if template is None:
+                    continue
+                if template.cls is Grammar.Rule:
+                    items.append(('r', template, template.node.RULE_REF().getText()))
+                    continue
+                items.append(('t', template, None))
+            elif block:
+                items.append(('b', [self._completion_items(alt.element()) for alt in block.altList().alternative()], None))
+        return items
+
+    @staticmethod
+    def _items_cost(items, costs):
+        cost = 0.0
+        for kind, value, name in items:
+            if kind == 't':
+                cost += 1.0
+            elif kind == 'r':
+                cost += costs.get(name, math.inf)
+            else:
+                cost += min([Grammar._items_cost(alt, costs) for alt in value])
+        return cost
+
+    @staticmethod
+    def _completion_templates(items, costs):
+        templates = []
+        stack = list(reversed(items))
+        while stack:
+            kind, value, _ = stack.pop()
+            if kind != 'b':
+                templates.append(value)
+                continue
+            alt = min(value, key=lambda items: Grammar._items_cost(items, costs))
+            stack.extend(reversed(alt))
+        return tuple(templates)
+
+    def references(self, name):
+        return self.rule_references.get(name, set())
+
+    def dependents(self, names):
+        # Returns the names and all rules referring them directly or indirectly
+        referrers = {}
+        for name, references in self.rule_references.items():
+            for reference in references:
+                referrers.setdefault(reference, []).append(name)
+        dependent_names = set(names)
+        names = list(names)
+        while names:
+            for referrer in referrers.get(names.pop(), []):
+                if referrer in dependent_names:
+                    continue
+                dependent_names.add(referrer)
+                names.append(referrer)
+        return dependent_names
+
+    def _parse_files(self, file_names):
+        file_roots = {}
+        if self.jobs <= 1 or len(file_names) <= 1:
+            for file_name in file_names:
+                file_roots[file_name] = Grammar._parse_stream_root(FileStream(file_name, encoding="utf-8"), self.prediction)
+            return file_roots
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(file_names))) as executor:
+            futures = [executor.submit(_parse_grammar_file, file_name, self.prediction.name) for file_name in file_names]
+            for file_name, future in zip(file_names, futures):
+                file_roots[file_name] = future.result()
+        return file_roots
+
+    @staticmethod
+    def _parse_stream_root(stream, prediction):
         lexer = ANTLRv4Lexer(stream)
         parser = ANTLRv4Parser(CommonTokenStream(lexer))
-        self.root = parser.grammarSpec()
-        assert isinstance(self.root, ANTLRv4Parser.GrammarSpecContext)
-        return True
+        if prediction == Grammar.Prediction.SLL_LL:
+            return Grammar._parse_sll_ll(parser)
+        return parser.grammarSpec()
+
+    @staticmethod
+    def _detach_tree(root):
+        # Fixes the token texts and drops the references to the parser, lexer and input stream
+        nodes = [root]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, TerminalNode):
+                token = node.symbol
+                token.text = token.text
+                token.source = (None, None)
+                continue
+            node.parser = None
+            node.exception = None
+            for token in (node.start, node.stop):
+                if token is not None:
+                    token.text = token.text
+                    token.source = (None, None)
+            if node.children:
+                nodes.extend(node.children)
+
+    def _resolve_file(self, name, base_file):
+        dirs = []
+        if base_file is not None:
+            dirs.append(os.path.dirname(base_file))
+        else:
+            dirs.append(os.getcwd())
+        dirs.extend(self.lib_dirs)
+        for dir in dirs:
+            file_name = os.path.abspath(os.path.join(dir, name + '.g4'))
+            if os.path.isfile(file_name):
+                return file_name
+        return None
+
+    def _find_dependent_files(self, file_name, root):
+        dep_files = []
+        for prequel in root.prequelConstruct():
+            if prequel.delegateGrammars():
+                for delegate in prequel.delegateGrammars().delegateGrammar():
+                    # "import A = B;" imports the grammar B as A
+                    name = delegate.identifier()[-1].getText()
+                    dep_file = self._resolve_file(name, file_name)
+                    if dep_file is None:
+                        raise Grammar.Error('Imported grammar (%s) is not found' % name)
+                    dep_files.append(dep_file)
+            if prequel.optionsSpec():
+                for option in prequel.optionsSpec().option():
+                    if option.identifier().getText() != 'tokenVocab':
+                        continue
+                    name = unquote(option.optionValue().getText())
+                    # A tokenVocab may refer only to a generated .tokens file
+                    dep_file = self._resolve_file(name, file_name)
+                    if dep_file is not None:
+                        dep_files.append(dep_file)
+        return dep_files
+
+    def _scan_dependent_files(self, file_name):
+        # Finds the dependent files with a light text scan to parse all of them concurrently
+        file_names = [file_name]
+        n = 0
+        while n < len(file_names):
+            with open(file_names[n], encoding="utf-8") as file:
+                text = Grammar.COMMENT_PATTERN.sub('', file.read())
+            names = []
+            for imports in Grammar.IMPORT_PATTERN.findall(text):
+                for delegate in imports.split(','):
+                    names.append(delegate.split('=')[-1].strip())
+            names.extend(Grammar.TOKEN_VOCAB_PATTERN.findall(text))
+            for name in names:
+                dep_file = self._resolve_file(name, file_names[n])
+                if dep_file is not None and dep_file not in file_names:
+                    file_names.append(dep_file)
+            n += 1
+        return file_names
+
+    def _build_index(self):
+        # Rules of the main grammar override the same rules of the imported grammars
+        self.rule_index = {}
+        self.lexer_rule_index = {}
+        for root in self.roots:
+            for rule in root.rules().ruleSpec():
+                if rule.parserRuleSpec():
+                    name = rule.parserRuleSpec().RULE_REF().getText()
+                    if name not in self.rule_index:
+                        self.symbol_table.intern(name)
+                        self.rule_index[name] = rule.parserRuleSpec()
+                    continue
+                name = rule.lexerRuleSpec().TOKEN_REF().getText()
+                if name not in self.lexer_rule_index:
+                    self.symbol_table.intern(name)
+                    self.lexer_rule_index[name] = rule.lexerRuleSpec()
+            for mode in root.modeSpec():
+                for rule_spec in mode.lexerRuleSpec():
+                    name = rule_spec.TOKEN_REF().getText()
+                    if name not in self.lexer_rule_index:
+                        self.symbol_table.intern(name)
+                        self.lexer_rule_index[name] = rule_spec
+
+    @staticmethod
+    def _parse_sll_ll(parser):
+        # Parses with the faster SLL prediction first and bails out on the first syntax error,
+        # then retries with the full LL prediction only when SLL could not parse the grammar.
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        parser.removeErrorListeners()
+        try:
+            return parser.grammarSpec()
+        except ParseCancellationException:
+            pass
+        parser.reset()
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+        return parser.grammarSpec()
+
+    def find_element_templates(self, ctx, is_recursive):
+        # Element decompositions are cached per ANTLR node and grouped by the owner rule to be invalidated on reload
+        key = (ctx.node, is_recursive)
+        rule_name = Grammar._owner_rule_name(ctx.node)
+        rule_cache = self.element_cache.get(rule_name)
+        if rule_cache is None:
+            rule_cache = {}
+            self.element_cache[rule_name] = rule_cache
+        templates = rule_cache.get(key)
+        if self.instrument is not None:
+            self.instrument.count('element_cache.hits' if templates is not None else 'element_cache.misses')
+        if templates is None:
+            templates = tuple(ctx.element_templates())
+            if is_recursive:
+                templates = self._resolve_block_templates(templates)
+            rule_cache[key] = templates
+        return templates
+
+    def find_alternative_templates(self, ctx):
+        # The alternatives of a rule or a block as tuples of shallow element templates, cached with the
+        # element templates of the owner rule under the None key
+        key = (ctx.node, None)
+        rule_name = Grammar._owner_rule_name(ctx.node)
+        rule_cache = self.element_cache.get(rule_name)
+        if rule_cache is None:
+            rule_cache = {}
+            self.element_cache[rule_name] = rule_cache
+        alts = rule_cache.get(key)
+        if self.instrument is not None:
+            self.instrument.count('element_cache.hits' if alts is not None else 'element_cache.misses')
+        if alts is None:
+            alts = tuple([tuple(templates) for templates in ctx.alternative_templates()])
+            rule_cache[key] = alts
+        return alts
+
+    def _resolve_block_templates(self, templates):
+        # Fills the elements of the nested blocks with an explicit stack, the shallow templates are
+        # copied because they are shared with the non-recursive cache
+        templates = [template.copy() for template in templates]
+        stack = list(templates)
+        while stack:
+            template = stack.pop()
+            if template.cls is not Grammar.BlockContext:
+                continue
+            block = Grammar.BlockContext(self, template.node)
+            children = [child.copy() for child in self.find_element_templates(block, False)]
+            template.children = tuple(children)
+            stack.extend(children)
+        return tuple(templates)
+
+    @staticmethod
+    def _owner_rule_name(node):
+        while node is not None:
+            if isinstance(node, ANTLRv4Parser.ParserRuleSpecContext):
+                return node.RULE_REF().getText()
+            node = node.parentCtx
+        return None
+
+    def intern_symbol(self, ctx):
+        # Symbol names are computed once per ANTLR node, getText() walks the whole subtree.
+        # Only the rule and terminal names go to the shared symbol table, the texts of the blocks and
+        # the other wrappers get negative ids local to this grammar.
+        entry = self.node_symbols.get(ctx.node)
+        if entry is None:
+            name = ctx.symbol()
+            if ctx.is_rulespeccontext() or ctx.is_lexerrulespeccontext() or ctx.is_terminal():
+                symbol_id = self.symbol_table.intern(name)
+            else:
+                symbol_id = self.local_symbols.setdefault(name, -1 - len(self.local_symbols))
+            entry = (name, symbol_id)
+            self.node_symbols[ctx.node] = entry
+        return entry
+
+    def symbol_ids(self, names):
+        return [self.symbol_table.intern(name) for name in names]
+
+    def clone_elements(self, templates):
+        elems = []
+        for template in templates:
+            elems.append(template.clone(self))
+        return elems
+
+    def has_terminal(self, name):
+        return name in self.terminals
+
+    def has_terminal_id(self, symbol_id):
+        return symbol_id in self.terminal_ids
+
+    def find_terminal(self, name):
+        return self.terminals.get(name)
 
     def rules(self):
         rules = []
-        for rule in self.root.rules().ruleSpec():
-            if rule.parserRuleSpec():
-                rule_spec = rule.parserRuleSpec()
-                rules.append(Grammar.Rule(self, rule_spec))
+        for rule_spec in self.rule_index.values():
+            rules.append(Grammar.Rule(self, rule_spec))
         return rules
 
     def find_rule(self, name):
-        for rule in self.rules():
-            if rule.symbol() == name:
-                return rule
-        raise Grammar.Error('Rule (%s) is not found' % name)
+        if self.instrument is not None:
+            start = time.perf_counter()
+        rule_spec = self.rule_index.get(name)
+        if rule_spec is None:
+            raise Grammar.Error('Rule (%s) is not found' % name)
+        rule = Grammar.Rule(self, rule_spec)
+        if self.instrument is not None:
+            self.instrument.add_time('grammar.find_rule', time.perf_counter() - start)
+        return rule
+
+    def lexer_rules(self):
+        rules = []
+        for rule_spec in self.lexer_rule_index.values():
+            rules.append(Grammar.LexerRule(self, rule_spec))
+        return rules
+
+    def find_lexer_rule(self, name):
+        rule_spec = self.lexer_rule_index.get(name)
+        if rule_spec is None:
+            return None
+        return Grammar.LexerRule(self, rule_spec)
 
     def print(self):
         self._print_node(self.root)
@@ -65,14 +647,51 @@ class Grammar:
         def __init__(self, msg):
             self.message = msg
 
+    class Prediction(Enum):
+        LL = 0
+        SLL_LL = 1
+
     class Repetition(Enum):
         NONE = 0
         QUESTION = 2
         STAR = 3
         PLUS = 4
 
+    class ElementTemplate(object):
+        # An immutable element decomposition which is cloned into a new context on demand
+        def __init__(self, cls, node, rep = None, children = None):
+            self.cls = cls
+            self.node = node
+            self.rep = rep
+            self.children = children
+
+        def copy(self):
+            return Grammar.ElementTemplate(self.cls, self.node, self.rep, self.children)
+
+        def new_context(self, grammar):
+            elem = self.cls(grammar, self.node)
+            if self.rep is not None:
+                elem.set_repetition(self.rep)
+            return elem
+
+        def clone(self, grammar):
+            elem = self.new_context(grammar)
+            stack = [(elem, self.children)]
+            while stack:
+                parent, templates = stack.pop()
+                if not templates:
+                    continue
+                children = [template.new_context(grammar) for template in templates]
+                parent.children = children
+                for child, template in zip(children, templates):
+                    stack.append((child, template.children))
+            return elem
+
     class BaseContext(object):
         def __init__(self, root, node):
+            # root may be the tree root context, the contexts refer the grammar directly
+            if isinstance(root, Grammar.BaseContext):
+                root = root.grammar
             self.grammar = root
             self.node = node
             self.rep = None
@@ -92,17 +711,34 @@ class Grammar:
             return self.grammar.find_rule(name)
 
         def elements(self, is_recursive = True):
+            instrument = self.grammar.instrument
+            if instrument is None:
+                return self.grammar.clone_elements(self.grammar.find_element_templates(self, is_recursive))
+            start = time.perf_counter()
+            elems = self.grammar.clone_elements(self.grammar.find_element_templates(self, is_recursive))
+            instrument.add_time('grammar.elements', time.perf_counter() - start)
+            node_cnt = 0
+            for elem in elems:
+                node_cnt += 1 + len(elem.descendants)
+            instrument.count('nodes.created', node_cnt)
+            return elems
+
+        def element_templates(self):
+            return []
+
+        def alternative_templates(self):
             return []
 
         def has_elements(self):
-            elements = self.elements(True)
-            if len(elements) <= 0:
+            if len(self.grammar.find_element_templates(self, False)) <= 0:
                 return False
             return True
 
         def symbol(self):
             if self.is_rulespeccontext():
                 return self.node.RULE_REF().getText()
+            if self.is_lexerrulespeccontext():
+                return self.node.TOKEN_REF().getText()
             return self.node.getText()
 
         def is_rulespeccontext(self):
@@ -123,7 +759,9 @@ class Grammar:
     class Context(BaseContext, NodeMixin):
         def __init__(self, root, node, parent = None, children = None):
             super(Grammar.Context, self).__init__(root, node)
-            self.name = self.symbol()
+            self.name, self.symbol_id = self.grammar.intern_symbol(self)
+            # True when one alternative is chosen, the chosen alternative may have no elements
+            self.expanded = False
             self.parent = parent
             if children:
                 self.children = children
@@ -144,25 +782,20 @@ class Grammar:
             children.append(elem)
             self.children = children
 
-        def _add_child_recursive(self, elem, depth, max_depth):
-            if (0 < max_depth) and (max_depth <= depth):
-                return
-            self._add_child_element(elem)
-            if elem.is_recursive_definition():
-                return
-            if elem.is_rulespeccontext():
-                for elem_child in elem.elements():
-                    elem._add_child_recursive(elem_child, (depth+1), max_depth)
-
         def add_child(self, elem, is_recursive = False):
+            self.add_children([elem], is_recursive)
+
+        def add_children(self, elems, is_recursive = False):
             if not is_recursive:
-                self._add_child_element(elem)
+                # anytree checks the ancestors on every assignment, so the children are assigned at once
+                children = list(self.children)
+                children.extend(elems)
+                self.children = children
                 return
-            self._add_child_recursive(elem, 0, 30)
+            self.expander().add_children(self, elems)
 
-        def add_children(self, elems, is_recursive = False):
-            for elem in elems:
-                self.add_child(elem, is_recursive)
+        def expander(self):
+            return Expander()
 
         def has_children(self):
             if len(self.children) <= 0:
@@ -170,9 +803,10 @@ class Grammar:
             return True
 
         def is_recursive_definition(self):
+            symbol_id = self.symbol_id
             parent_node = self.parent
             while parent_node:
-                if self.symbol() == parent_node.symbol():
+                if parent_node.symbol_id == symbol_id:
                     return True
                 parent_node = parent_node.parent
             return False
@@ -187,14 +821,16 @@ class Grammar:
                 return False
             return True
 
+        def is_expanded(self):
+            return self.expanded
+
         def expand(self):
             elems = self.elements()
             self.add_children(elems)
             return True
 
         def tree(self):
-            name = self.symbol()
-            rule = self.find_rule(name)
+            rule = self.find_rule(self.name)
             assert(rule)
             elems = rule.elements()
             rule.add_children(elems)
@@ -207,20 +843,28 @@ class Grammar:
         def __init__(self, root, node:ANTLRv4Parser.ParserRuleSpecContext):
             super().__init__(root, node)
 
-        def elements(self, is_recursive = True):
-            elems = []
+        def element_templates(self):
+            templates = []
+            for alt in self.alternative_templates():
+                templates.extend(alt)
+            return templates
+
+        def alternative_templates(self):
+            alts = []
             for labeled_alt in self.node.ruleBlock().ruleAltList().labeledAlt():
+                templates = []
                 for atl_elem in labeled_alt.alternative().element():
-                    elem_ctx = Grammar.ElementContext(self.root, atl_elem)
-                    elem_elems = elem_ctx.elements(is_recursive)
-                    if not elem_elems:
-                        continue
-                    elems.extend(elem_elems)
-            return elems
+                    elem_ctx = Grammar.ElementContext(self.grammar, atl_elem)
+                    templates.extend(elem_ctx.element_templates())
+                alts.append(templates)
+            return alts
 
         def find(self, name):
+            symbol_id = self.grammar.symbol_table.find_id(name)
+            if symbol_id is None:
+                return None
             for elem in self.elements():
-                if elem.symbol() == name:
+                if elem.symbol_id == symbol_id:
                     return elem
             return None
 
@@ -228,56 +872,63 @@ class Grammar:
         def __init__(self, root, node:ANTLRv4Parser.ElementContext):
             super().__init__(root, node)
 
-        def elements(self, is_recursive = True):
-            #node_str = self.node.getText()
-            #print(node_str)
+        def element_templates(self):
             if self.node.actionBlock():
                 return []
             if self.node.labeledElement():
-                labeled_elem = Grammar.LabeledElementContext(self.root, self.node.labeledElement())
-                return labeled_elem.elements(is_recursive)
+                labeled_elem = Grammar.LabeledElementContext(self.grammar, self.node.labeledElement())
+                templates = labeled_elem.element_templates()
+                if self.node.ebnfSuffix():
+                    for template in templates:
+                        template.rep = self.node.ebnfSuffix().getText()
+                return templates
             if self.node.atom():
-                atom = Grammar.AtomContext(self.root, self.node.atom())
-                elem = atom.element()
+                atom = Grammar.AtomContext(self.grammar, self.node.atom())
+                template = atom.element_template()
+                if template is None:
+                    return []
                 if self.node.ebnfSuffix():
-                    elem.set_repetition(self.node.ebnfSuffix().getText())
-                return [elem]
+                    template.rep = self.node.ebnfSuffix().getText()
+                return [template]
             if self.node.ebnf():
-                block = Grammar.BlockContext(self.root, self.node.ebnf().block(), self.node.ebnf().blockSuffix())
-                if is_recursive:
-                    block.add_children(block.elements(is_recursive))
-                return [block]
+                return [Grammar.BlockContext.block_template(self.grammar, self.node.ebnf().block(), self.node.ebnf().blockSuffix())]
             return []
 
     class LabeledElementContext(Context):
         def __init__(self, root, node:ANTLRv4Parser.LabeledElementContext):
             super().__init__(root, node)
 
-        def elements(self, is_recursive = True):
+        def element_templates(self):
             if self.node.atom():
-                atom = Grammar.AtomContext(self.root, self.node.atom())
-                return [atom.element()]
+                atom = Grammar.AtomContext(self.grammar, self.node.atom())
+                template = atom.element_template()
+                if template is None:
+                    return []
+                return [template]
             if self.node.block():
-                block = Grammar.BlockContext(self.root, self.node.ebnf().block(), self.node.ebnf().blockSuffix())
-                if is_recursive:
-                    block.add_children(block.elements(is_recursive))
-                return [block]
-            return None
+                return [Grammar.BlockContext.block_template(self.grammar, self.node.block(), None)]
+            return []
 
     class AtomContext(Context):
         def __init__(self, root, node:ANTLRv4Parser.AtomContext):
             super().__init__(root, node)
 
         def element(self):
+            template = self.element_template()
+            if template is None:
+                return None
+            return template.clone(self.grammar)
+
+        def element_template(self):
             term = self.node.terminal()
             if term:
-                return Grammar.Element(self.root, term)
+                return Grammar.ElementTemplate(Grammar.Element, term)
             rule_ref = self.node.ruleref()
             if rule_ref:
                 rule_name = rule_ref.RULE_REF().getText()
                 rule = self.find_rule(rule_name)
                 if rule:
-                   return Grammar.Rule(self.root, rule.node) 
+                    return Grammar.ElementTemplate(Grammar.Rule, rule.node)
             return None
 
     class BlockContext(Context):
@@ -286,14 +937,29 @@ class Grammar:
             if suffix is not None:
                 self.set_repetition(suffix.getText())
 
-        def elements(self, is_recursive = True):
-            elems = []
+        def element_templates(self):
+            templates = []
+            for alt in self.alternative_templates():
+                templates.extend(alt)
+            return templates
+
+        def alternative_templates(self):
+            alts = []
             for alt in self.node.altList().alternative():
+                templates = []
                 for alt_elem in alt.element():
-                    elem_ctx = Grammar.ElementContext(self.root, alt_elem)
-                    elem_elems = elem_ctx.elements(is_recursive)
-                    elems.extend(elem_elems)
-            return elems
+                    elem_ctx = Grammar.ElementContext(self.grammar, alt_elem)
+                    templates.extend(elem_ctx.element_templates())
+                alts.append(templates)
+            return alts
+
+        @staticmethod
+        def block_template(grammar, node, suffix):
+            # The elements of the block are filled by Grammar.find_element_templates() when recursive
+            rep = None
+            if suffix is not None:
+                rep = suffix.getText()
+            return Grammar.ElementTemplate(Grammar.BlockContext, node, rep)
 
     class Rule(RuleContext):
         def __init__(self, root, node:ANTLRv4Parser.ParserRuleSpecContext, parent=None):
@@ -308,9 +974,40 @@ class Grammar:
                     continue
                 if node.is_terminal():
                     continue
-                symbol_names[node.symbol()] = 1
-            return symbol_names.keys()
+                symbol_names[node.symbol_id] = node.name
+            return symbol_names.values()
 
     class Element(Context):
         def __init__(self, root, node:ParserRuleContext):
             super().__init__(root, node)
+
+    class LexerRule(BaseContext):
+        def __init__(self, root, node:ANTLRv4Parser.LexerRuleSpecContext):
+            super().__init__(root, node)
+
+        def is_fragment(self):
+            if self.node.FRAGMENT():
+                return True
+            return False
+
+        def alternatives(self):
+            return self.node.lexerRuleBlock().lexerAltList().lexerAlt()
+
+        def literal(self):
+            # Returns the text when the rule is a fixed sequence of string literals
+            alts = self.alternatives()
+            if len(alts) != 1 or alts[0].lexerElements() is None:
+                return None
+            texts = []
+            for elem in alts[0].lexerElements().lexerElement():
+                if elem.actionBlock():
+                    continue
+                if elem.ebnfSuffix() or not elem.lexerAtom():
+                    return None
+                term = elem.lexerAtom().terminal()
+                if term is None or term.STRING_LITERAL() is None:
+                    return None
+                texts.append(unquote(term.STRING_LITERAL().getText()))
+            if len(texts) <= 0:
+                return None
+            return ''.join(texts)
@@ -0,0 +1,73 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import json
+import time
+
+class Instrument:
+    # Records wall times with call counts and plain counters by name. The instrumented classes keep
+    # None instead of an instance while disabled, so the hot paths pay only an attribute check.
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+
+    def add_time(self, name, seconds):
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = [0, 0.0]
+            self.timings[name] = timing
+        timing[0] += 1
+        timing[1] += seconds
+
+    def count(self, name, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timer(self, name):
+        return Instrument.Timer(self, name)
+
+    def reset(self):
+        self.timings = {}
+        self.counters = {}
+
+    def to_dict(self):
+        timings = {}
+        for name, (count, seconds) in sorted(self.timings.items()):
+            timings[name] = {'count': count, 'seconds': seconds}
+        return {
+            'timings': timings,
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def dumps(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def dump(self, file_name):
+        with open(file_name, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    class Timer:
+        def __init__(self, instrument, name):
+            self.instrument = instrument
+            self.name = name
+            self.start = None
+
+        def __enter__(self):
+            self.start = time.perf_counter()
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.instrument.add_time(self.name, time.perf_counter() - self.start)
+            return False
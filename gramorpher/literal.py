@@ -0,0 +1,106 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+ESCAPES = {
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'b': '\b',
+    'f': '\f',
+}
+
+def is_quoted(text):
+    if len(text) < 2:
+        return False
+    return text[0] == "'" and text[-1] == "'"
+
+def unescape(text):
+    if '\\' not in text:
+        return text
+    chars = []
+    n = 0
+    text_len = len(text)
+    while n < text_len:
+        c = text[n]
+        n += 1
+        if c != '\\' or text_len <= n:
+            chars.append(c)
+            continue
+        c = text[n]
+        n += 1
+        if c == 'u':
+            if n < text_len and text[n] == '{':
+                end = text.index('}', n)
+                chars.append(chr(int(text[n+1:end], 16)))
+                n = end + 1
+            else:
+                chars.append(chr(int(text[n:n+4], 16)))
+                n += 4
+            continue
+        chars.append(ESCAPES.get(c, c))
+    return ''.join(chars)
+
+def unquote(text):
+    if not is_quoted(text):
+        return text
+    return unescape(text[1:-1])
+
+def char_set(text):
+    # Returns code points of an ANTLR lexer char set such as [a-z_\n]
+    if text.startswith('['):
+        text = text[1:-1]
+    chars = []
+    n = 0
+    text_len = len(text)
+    while n < text_len:
+        c = text[n]
+        if c == '\\' and (n + 1) < text_len:
+            esc = text[n+1]
+            if esc == 'u':
+                if text[n+2] == '{':
+                    end = text.index('}', n)
+                    chars.append(chr(int(text[n+3:end], 16)))
+                    n = end + 1
+                else:
+                    chars.append(chr(int(text[n+2:n+6], 16)))
+                    n += 6
+                continue
+            chars.append(ESCAPES.get(esc, esc))
+            n += 2
+            continue
+        # A dash between two chars is a range, elsewhere it is a literal dash
+        if c == '-' and chars and (n + 1) < text_len:
+            chars.append(None)
+            n += 1
+            continue
+        chars.append(c)
+        n += 1
+    codes = set()
+    n = 0
+    chars_len = len(chars)
+    while n < chars_len:
+        c = chars[n]
+        if c is None:
+            codes.add(ord('-'))
+            n += 1
+            continue
+        if (n + 2) < chars_len and chars[n+1] is None and chars[n+2] is not None:
+            codes.update(range(ord(c), ord(chars[n+2]) + 1))
+            n += 3
+            continue
+        codes.add(ord(c))
+        n += 1
+    return codes
@@ -21,13 +21,10 @@ from .corpus import Corpus
 from .symbols import SymbolCase
 
 class PictCorpus(Corpus):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, symbol_table = None):
+        super().__init__(symbol_table)
         self.names = []
 
-    def has_symbol(self, name):
-        return name in self.names
-
     def parse_file(self, file_name):
         obj = open(file_name, newline='')
         return self._parse_object(obj)
@@ -39,6 +36,7 @@ class PictCorpus(Corpus):
     def _parse_object(self, obj):
         reader = csv.reader(obj, delimiter='\t')
         self.names = next(reader)
+        self.symbol_ids = frozenset([self.symbol_table.intern(name) for name in self.names])
         name_cnt = len(self.names)
         for row in reader:
             sc = SymbolCase()
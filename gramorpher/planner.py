@@ -0,0 +1,87 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import heapq
+from itertools import combinations
+from .symbols import SymbolCase
+
+class Planner:
+    def __init__(self, corpus, pairwise = False):
+        self.corpus = corpus
+        self.pairwise = pairwise
+
+    def project(self, symbols):
+        # Projects the corpus rows onto the symbols and drops duplicated projections
+        if len(symbols) <= 0:
+            return [()]
+        rows = []
+        row_set = set()
+        for case in self.corpus.cases:
+            row = tuple([case.find_case(symbol) for symbol in symbols])
+            if row in row_set:
+                continue
+            row_set.add(row)
+            rows.append(row)
+        return rows
+
+    def plan(self, shape_symbols):
+        # shape_symbols is a list of corpus symbol lists used by each shape.
+        # Returns (shape index, SymbolCase) pairs to execute.
+        candidates = []
+        for n, symbols in enumerate(shape_symbols):
+            for row in self.project(symbols):
+                candidates.append((n, symbols, row))
+        if self.pairwise:
+            candidates = self._reduce_pairwise(candidates)
+        plans = []
+        for n, symbols, row in candidates:
+            case = SymbolCase()
+            for symbol, value in zip(symbols, row):
+                case.add_case(symbol, value)
+            plans.append((n, case))
+        return plans
+
+    @staticmethod
+    def _coverage(candidate):
+        n, symbols, row = candidate
+        items = [(None, n)]
+        items.extend(zip(symbols, row))
+        coverage = set(items)
+        coverage.update(combinations(items, 2))
+        return coverage
+
+    def _reduce_pairwise(self, candidates):
+        # Greedy set cover over the shape choice and value pairs. The gain of a candidate never grows,
+        # so stale gains in the heap are re-evaluated lazily only when they reach the top.
+        coverages = [Planner._coverage(candidate) for candidate in candidates]
+        uncovered = set()
+        for coverage in coverages:
+            uncovered |= coverage
+        heap = [(-len(coverage), n) for n, coverage in enumerate(coverages)]
+        heapq.heapify(heap)
+        selected = []
+        while uncovered and heap:
+            neg_gain, n = heapq.heappop(heap)
+            gain = len(coverages[n] & uncovered)
+            if gain <= 0:
+                continue
+            if gain < -neg_gain:
+                heapq.heappush(heap, (-gain, n))
+                continue
+            selected.append(n)
+            uncovered -= coverages[n]
+        selected.sort()
+        return [candidates[n] for n in selected]
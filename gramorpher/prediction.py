@@ -0,0 +1,160 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import sys
+import pickle
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.dfa.DFA import DFA
+from antlr4.PredictionContext import PredictionContext
+from .antlr import ANTLRv4Parser, ANTLRv4Lexer
+from .grammar import Grammar
+
+class PredictionCache:
+    # A small grammar using most ANTLR constructs to visit the common prediction decisions
+    SAMPLE_GRAMMAR = r"""
+grammar Sample;
+
+tokens { INDENT, DEDENT }
+
+@header { import sys }
+@parser::members { count = 0 }
+
+stmt_list : stmt (SEMI stmt)* SEMI? EOF ;
+
+stmt [int depth] returns [int value] locals [int n = 0]
+    @init { self.count += 1 }
+    : <assoc=right> expr                         # exprStmt
+    | 'let' name=ID '=' value+=expr              # letStmt
+    | 'if' expr 'then' stmt ('else' stmt)?       # ifStmt
+    | ( 'print' | 'echo' ) ~SEMI+?               # printStmt
+    | { self.count > 0 }? 'pass'                 # passStmt
+    ;
+
+expr
+    : expr ('*' | '/') expr
+    | expr ('+' | '-') expr
+    | '(' expr ')'
+    | ID '(' (expr (',' expr)*)? ')'
+    | (ID | INT | FLOAT | STRING)
+    ;
+
+catch_rule : ID ;
+    catch [Exception e] { pass }
+    finally { pass }
+
+SEMI   : ';' ;
+ID     : [a-zA-Z_] [a-zA-Z_0-9]* ;
+INT    : DIGIT+ ;
+FLOAT  : DIGIT+ '.' DIGIT* | '.' DIGIT+ ;
+STRING : '"' ( '\\' . | ~["\\\r\n] )* '"' ;
+CHAR   : '\'' ~('\'' | '\\') '\'' ;
+RANGE  : 'a'..'z' ;
+fragment DIGIT : [0-9] ;
+WS     : [ \t\r\n\u000C]+ -> skip ;
+LINE_COMMENT : '//' ~[\r\n]* -> channel(HIDDEN) ;
+OPEN   : '<<' -> pushMode(INSIDE) ;
+
+mode INSIDE;
+CLOSE  : '>>' -> popMode ;
+TEXT   : . -> more ;
+"""
+
+    @staticmethod
+    def warm_up(grammar_files = None):
+        # Parses the sample grammar and the given files to fill the shared prediction DFA
+        Grammar().parse_string(PredictionCache.SAMPLE_GRAMMAR)
+        if grammar_files is None:
+            return True
+        for grammar_file in grammar_files:
+            Grammar().parse_file(grammar_file)
+        return True
+
+    @staticmethod
+    def clear():
+        for recognizer in (ANTLRv4Parser, ANTLRv4Lexer):
+            atn = recognizer.atn
+            recognizer.decisionsToDFA[:] = [DFA(ds, i) for i, ds in enumerate(atn.decisionToState)]
+
+    @staticmethod
+    def save(file_name):
+        with open(file_name, 'wb') as file:
+            pickler = PredictionCache.Pickler(file, protocol=pickle.HIGHEST_PROTOCOL)
+            PredictionCache._dump(pickler)
+        return True
+
+    @staticmethod
+    def load(file_name):
+        # Replaces the DFA lists in place, the simulators of new parsers share the class-level lists
+        with open(file_name, 'rb') as file:
+            unpickler = PredictionCache.Unpickler(file)
+            parser_dfa, lexer_dfa = PredictionCache._load(unpickler)
+        if len(parser_dfa) != len(ANTLRv4Parser.decisionsToDFA) or len(lexer_dfa) != len(ANTLRv4Lexer.decisionsToDFA):
+            raise PredictionCache.Error('Prediction cache (%s) does not match the ANTLR parser' % file_name)
+        ANTLRv4Parser.decisionsToDFA[:] = parser_dfa
+        ANTLRv4Lexer.decisionsToDFA[:] = lexer_dfa
+        return True
+
+    @staticmethod
+    def _dump(pickler):
+        # DFA states link each other deeply through their edges
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(recursion_limit, 100000))
+        try:
+            pickler.dump((ANTLRv4Parser.decisionsToDFA, ANTLRv4Lexer.decisionsToDFA))
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+    @staticmethod
+    def _load(unpickler):
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(recursion_limit, 100000))
+        try:
+            return unpickler.load()
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+    # ATN states and the singleton contexts are shared with the generated parser,
+    # so they are stored as references instead of copies.
+    RECOGNIZERS = {'parser': ANTLRv4Parser, 'lexer': ANTLRv4Lexer}
+
+    class Pickler(pickle.Pickler):
+        def persistent_id(self, obj):
+            if isinstance(obj, ATNState):
+                for name, recognizer in PredictionCache.RECOGNIZERS.items():
+                    if obj.atn is recognizer.atn:
+                        return (name, obj.stateNumber)
+                raise PredictionCache.Error('ATN state (%s) is not of the ANTLR parser' % str(obj))
+            if obj is SemanticContext.NONE:
+                return ('none', 0)
+            if obj is PredictionContext.EMPTY:
+                return ('empty', 0)
+            return None
+
+    class Unpickler(pickle.Unpickler):
+        def persistent_load(self, pid):
+            name, n = pid
+            if name in PredictionCache.RECOGNIZERS:
+                return PredictionCache.RECOGNIZERS[name].atn.states[n]
+            if name == 'none':
+                return SemanticContext.NONE
+            if name == 'empty':
+                return PredictionContext.EMPTY
+            raise pickle.UnpicklingError('Unknown persistent id (%s)' % str(pid))
+
+    class Error(Exception):
+        def __init__(self, msg):
+            self.message = msg
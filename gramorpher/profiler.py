@@ -0,0 +1,147 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import sys
+import cProfile
+import pstats
+import tracemalloc
+
+class Profiler:
+    # Profiles the enclosed code with cProfile and traces the memory allocations of each stage with tracemalloc:
+    #   with Profiler('gen', trace_memory=True) as profiler:
+    #       with profiler.stage('generate'):
+    #           ...
+    # writes gen.pstats and gen.collapsed, the collapsed stacks are the input of flamegraph.pl.
+    MAX_STACK_DEPTH = 64
+    TRACE_FRAMES = 1
+
+    def __init__(self, file_prefix = None, trace_memory = False, top = 10):
+        self.file_prefix = file_prefix
+        self.trace_memory = trace_memory
+        self.top = top
+        self.profile = None
+        self.memory_stats = {}
+        self.is_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(Profiler.TRACE_FRAMES)
+            self.is_tracing = True
+        if self.file_prefix is not None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+            self.write_stats(self.file_prefix + '.pstats')
+            self.write_collapsed(self.file_prefix + '.collapsed')
+        if self.is_tracing:
+            tracemalloc.stop()
+            self.is_tracing = False
+
+    def stage(self, name):
+        return Profiler.Stage(self, name)
+
+    def write_stats(self, file_name):
+        self.profile.dump_stats(file_name)
+
+    def write_collapsed(self, file_name):
+        with open(file_name, 'w') as file:
+            for stack, value in self.collapsed_stacks():
+                file.write('%s %d\n' % (';'.join(stack), value))
+
+    def collapsed_stacks(self):
+        # cProfile records caller/callee edges only, so the own time of each function is distributed
+        # to the paths from the roots in proportion to the cumulative time of each edge.
+        stats = pstats.Stats(self.profile).stats
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, (_, _, _, cumtime) in callers.items():
+                callees.setdefault(caller, []).append((func, cumtime))
+        roots = [func for func, (_, _, _, _, callers) in stats.items() if len(callers) <= 0]
+        stacks = {}
+        nodes = [((func,), 1.0) for func in roots]
+        while nodes:
+            path, ratio = nodes.pop()
+            func = path[-1]
+            _, _, tottime, cumtime, _ = stats[func]
+            value = int(tottime * ratio * 1000000)
+            if 0 < value:
+                key = tuple([Profiler._func_label(path_func) for path_func in path])
+                stacks[key] = stacks.get(key, 0) + value
+            if Profiler.MAX_STACK_DEPTH <= len(path) or cumtime <= 0:
+                continue
+            for callee, edge_cumtime in callees.get(func, []):
+                if callee in path:
+                    continue
+                callee_cumtime = stats[callee][3]
+                if callee_cumtime <= 0:
+                    continue
+                callee_ratio = ratio * (edge_cumtime / callee_cumtime)
+                if 0.0001 <= callee_ratio:
+                    nodes.append((path + (callee,), callee_ratio))
+        return sorted(stacks.items())
+
+    @staticmethod
+    def _func_label(func):
+        file_name, line, name = func
+        if file_name == '~':
+            return name
+        return '%s:%d:%s' % (file_name.split('/')[-1], line, name)
+
+    def print_memory_stats(self, fp = None):
+        fp = fp if fp is not None else sys.stderr
+        for name, stats in self.memory_stats.items():
+            print('[%s] top %d allocations' % (name, len(stats)), file=fp)
+            for location, size, count in stats:
+                print('  %s: %.1f KiB in %d blocks' % (location, size / 1024, count), file=fp)
+
+    class Stage:
+        def __init__(self, profiler, name):
+            self.profiler = profiler
+            self.name = name
+            self.snapshot = None
+
+        def __enter__(self):
+            if tracemalloc.is_tracing():
+                self.snapshot = tracemalloc.take_snapshot()
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            if self.snapshot is None:
+                return False
+            # The allocations made in the stage and still alive at its end,
+            # filter_traces() copies every trace, so the tracemalloc frames are skipped here instead
+            diffs = tracemalloc.take_snapshot().compare_to(self.snapshot, 'lineno')
+            stats = []
+            for diff in diffs:
+                if diff.size_diff <= 0:
+                    continue
+                frame = diff.traceback[0]
+                if frame.filename == tracemalloc.__file__:
+                    continue
+                stats.append(('%s:%d' % (frame.filename, frame.lineno), diff.size_diff, diff.count_diff))
+            stats.sort(key=lambda stat: stat[1], reverse=True)
+            self.profiler.memory_stats[self.name] = stats[:self.profiler.top]
+            return False
@@ -0,0 +1,130 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import os
+import sys
+import time
+import threading
+
+class Progress:
+    # Reports the progress of a generation run periodically from a timer thread. The generating loop
+    # only increments case_count, so the reporting costs nothing per case:
+    #   with Progress(interval=5.0) as progress:
+    #       for text in generator.iter_cases('stmt', 1000000, progress=progress):
+    #           ...
+    # The callback receives the dict of report(), the report is written to stderr without a callback.
+    INTERVAL = 1.0
+
+    def __init__(self, interval = INTERVAL, callback = None, fp = None):
+        self.interval = interval
+        self.callback = callback
+        self.fp = fp
+        self.case_count = 0
+        self.depth = 0
+        self.symbol_count = 0
+        self.symbol_ids = set()
+        self.start_time = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.stopped.clear()
+        if 0 < self.interval:
+            self.thread = threading.Thread(target=self._run, name='gramorpher-progress', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        # Emits the final report once the thread exits
+        if self.start_time is None:
+            return
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.emit()
+        self.start_time = None
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.emit()
+
+    def add_derivation(self, rule, symbol_count):
+        # Records the depth of the derivation tree and the parser rules it covers out of symbol_count
+        self.symbol_count = symbol_count
+        nodes = [(rule, 0)]
+        while nodes:
+            node, depth = nodes.pop()
+            if self.depth < depth:
+                self.depth = depth
+            if node.is_rulespeccontext():
+                self.symbol_ids.add(node.symbol_id)
+            for child in node.children:
+                nodes.append((child, depth + 1))
+
+    def coverage(self):
+        if self.symbol_count <= 0:
+            return 0.0
+        return len(self.symbol_ids) / self.symbol_count
+
+    def report(self):
+        elapsed = 0.0
+        if self.start_time is not None:
+            elapsed = time.perf_counter() - self.start_time
+        case_count = self.case_count
+        return {
+            'cases': case_count,
+            'elapsed': elapsed,
+            'rate': case_count / elapsed if 0 < elapsed else 0.0,
+            'depth': self.depth,
+            'coverage': self.coverage(),
+            'rss': Progress.rss(),
+        }
+
+    def emit(self):
+        report = self.report()
+        if self.callback is not None:
+            self.callback(report)
+            return
+        fp = self.fp if self.fp is not None else sys.stderr
+        print('%d cases in %.1f sec (%.1f cases/sec), depth %d, coverage %.1f%%, rss %.1f MiB' % (
+            report['cases'], report['elapsed'], report['rate'], report['depth'], report['coverage'] * 100, report['rss'] / (1024 * 1024)), file=fp)
+        fp.flush()
+
+    @staticmethod
+    def rss():
+        # The current resident set size in bytes, the peak size where /proc is not available
+        try:
+            with open('/proc/self/statm') as file:
+                return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+        except ImportError:
+            return 0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return rss
+        return rss * 1024
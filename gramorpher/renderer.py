@@ -0,0 +1,144 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import time
+import codecs
+from .template import Template, TemplateCache
+
+class Renderer:
+    def __init__(self, generator, separator = None, case_separator = '\n', encoding = 'utf-8'):
+        # separator is put between the tokens, None means the default separator of the grammar
+        self.generator = generator
+        self.encoding = encoding
+        # The pre-encoded terminals of the grammar are UTF-8
+        self.is_utf8 = codecs.lookup(encoding).name == 'utf-8'
+        self.separator = separator
+        self.case_separator = case_separator.encode(encoding)
+        self.buffer = bytearray()
+        self.templates = TemplateCache(generator.grammar.symbol_table)
+
+    def render(self, rule, case = None):
+        instrument = self.generator.instrument
+        if instrument is None:
+            return self.template(rule).bind(self.generator, case)
+        start = time.perf_counter()
+        text = self.template(rule).bind(self.generator, case)
+        instrument.add_time('renderer.render', time.perf_counter() - start)
+        return text
+
+    def render_bytes(self, rule, case = None):
+        buffer = bytearray()
+        self._render_into(buffer, rule, case)
+        return bytes(buffer)
+
+    def render_cases(self, rule, cases):
+        # Compiles the derivation once and fills its slots for each case
+        template = self.template(rule)
+        return [template.bind(self.generator, case) for case in cases]
+
+    def template(self, rule):
+        template = self.templates.find(rule)
+        if self.generator.instrument is not None:
+            self.generator.instrument.count('template_cache.hits' if template is not None else 'template_cache.misses')
+        if template is None:
+            template = self.compile(rule)
+            self.templates.add(rule, template)
+        return template
+
+    def token_separator(self):
+        if self.separator is not None:
+            return self.separator
+        return self.generator.grammar.default_separator
+
+    def compile(self, rule):
+        # The literal chunks are kept as texts for render() and as bytes for the buffers
+        grammar = self.generator.grammar
+        terminal_ids = grammar.terminal_ids
+        terminal_bytes = grammar.terminal_bytes if self.is_utf8 else {}
+        encoding = self.encoding
+        separator = self.token_separator()
+        separator_data = separator.encode(encoding)
+        chunks = []
+        byte_chunks = []
+        slots = []
+        texts = []
+        datas = []
+        is_first = True
+        nodes = [rule]
+        while nodes:
+            node = nodes.pop()
+            children = node.children
+            if children:
+                nodes.extend(reversed(children))
+                continue
+            if node.is_blockcontext() or node.is_expanded():
+                # The block leaves are left open, the expanded leaves chose an empty alternative
+                continue
+            if separator and not is_first:
+                texts.append(separator)
+                datas.append(separator_data)
+            is_first = False
+            text = terminal_ids.get(node.symbol_id)
+            if text is not None:
+                texts.append(text)
+                data = terminal_bytes.get(node.name)
+                datas.append(data if data is not None else text.encode(encoding))
+                continue
+            chunks.append(''.join(texts))
+            byte_chunks.append(b''.join(datas))
+            slots.append(node.name)
+            texts = []
+            datas = []
+        chunks.append(''.join(texts))
+        byte_chunks.append(b''.join(datas))
+        return Template(chunks, slots, byte_chunks)
+
+    def render_batch(self, items):
+        # Renders (rule, case) pairs into the reusable buffer and returns a memoryview per case.
+        # The views are valid until the next call of render_batch().
+        buffer = self._reset_buffer()
+        offsets = []
+        for rule, case in items:
+            begin = len(buffer)
+            self._render_into(buffer, rule, case)
+            offsets.append((begin, len(buffer)))
+            buffer += self.case_separator
+        view = memoryview(buffer)
+        return [view[begin:end] for begin, end in offsets]
+
+    def write(self, fp, items):
+        # Writes rendered cases with a single write call per batch, fp can be a file or a socket file
+        start = time.perf_counter()
+        buffer = self._reset_buffer()
+        for rule, case in items:
+            self._render_into(buffer, rule, case)
+            buffer += self.case_separator
+        fp.write(memoryview(buffer))
+        if self.generator.instrument is not None:
+            self.generator.instrument.add_time('renderer.write', time.perf_counter() - start)
+            self.generator.instrument.count('renderer.bytes', len(buffer))
+        return len(buffer)
+
+    def _reset_buffer(self):
+        try:
+            del self.buffer[:]
+        except BufferError:
+            # Views returned by the previous batch are still alive
+            self.buffer = bytearray()
+        return self.buffer
+
+    def _render_into(self, buffer, rule, case):
+        self.template(rule).bind_into(buffer, self.generator, case, self.encoding)
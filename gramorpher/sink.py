@@ -0,0 +1,132 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import os
+import sys
+import gzip
+
+class Sink:
+    # Writes the rendered batches to stdout or a file through a large buffer, optionally compressed
+    # and rotated by size:
+    #   with Sink('cases.jsonl.gz', 'gzip', max_bytes=1 << 30) as sink:
+    #       sink.write(data)
+    # writes cases-00000.jsonl.gz, cases-00001.jsonl.gz, ... of max_bytes uncompressed bytes at most.
+    # The batches are not split, so only a batch larger than max_bytes makes a larger file.
+    # The zstd compression requires the zstandard package.
+    COMPRESSIONS = ['gzip', 'zstd']
+    EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+    LEVELS = {'gzip': 6, 'zstd': 3}
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, file_name = None, compression = None, buffer_size = BUFFER_SIZE, max_bytes = 0, level = None):
+        if compression is not None and compression not in Sink.COMPRESSIONS:
+            raise Sink.Error('Compression (%s) is not supported' % compression)
+        if file_name is None and 0 < max_bytes:
+            raise Sink.Error('Standard output is not rotated')
+        self.file_name = file_name
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.level = level if level is not None else Sink.LEVELS.get(compression)
+        self.file_names = []
+        self.file_bytes = 0
+        self.written = 0
+        self.file = None
+        self.stream = None
+        self.zstandard = None
+        if compression == 'zstd':
+            # Fails before any output is written
+            try:
+                import zstandard
+            except ImportError:
+                raise Sink.Error('zstd compression requires the zstandard package')
+            self.zstandard = zstandard
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @staticmethod
+    def find_compression(file_name):
+        # Returns the compression of the file name extension or None
+        if file_name is None:
+            return None
+        return Sink.EXTENSIONS.get(os.path.splitext(file_name)[1])
+
+    @staticmethod
+    def rotated_file_name(file_name, index):
+        # cases.jsonl.gz is rotated into cases-00000.jsonl.gz, cases-00001.jsonl.gz, ...
+        dir_name, base_name = os.path.split(file_name)
+        stem, dot, extensions = base_name.partition('.')
+        return os.path.join(dir_name, '%s-%05d%s%s' % (stem, index, dot, extensions))
+
+    def write(self, data):
+        data_len = len(data)
+        if self.stream is None:
+            self._open()
+        elif 0 < self.max_bytes and 0 < self.file_bytes and self.max_bytes < (self.file_bytes + data_len):
+            self._close_stream()
+            self._open()
+        self.stream.write(data)
+        self.file_bytes += data_len
+        self.written += data_len
+        return data_len
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def close(self):
+        # A sink without any write still creates its (first) file
+        if self.stream is None and self.file_name is not None and not self.file_names:
+            self._open()
+        if self.stream is not None:
+            self._close_stream()
+
+    def _open(self):
+        if self.file_name is None:
+            self.file = sys.stdout.buffer
+        else:
+            file_name = self.file_name
+            if 0 < self.max_bytes:
+                file_name = Sink.rotated_file_name(self.file_name, len(self.file_names))
+            self.file = open(file_name, 'wb', buffering=self.buffer_size)
+            self.file_names.append(file_name)
+        self.file_bytes = 0
+        if self.compression == 'gzip':
+            self.stream = gzip.GzipFile(fileobj=self.file, mode='wb', compresslevel=self.level)
+        elif self.compression == 'zstd':
+            self.stream = self.zstandard.ZstdCompressor(level=self.level).stream_writer(self.file, closefd=False)
+        else:
+            self.stream = self.file
+
+    def _close_stream(self):
+        # The compressed streams leave the file open, stdout is flushed only
+        if self.stream is not self.file:
+            self.stream.close()
+        if self.file_name is None:
+            self.file.flush()
+        else:
+            self.file.close()
+        self.stream = None
+        self.file = None
+
+    class Error(Exception):
+        def __init__(self, msg):
+            self.message = msg
@@ -37,3 +37,29 @@ class SymbolCases(list):
 
     def add_case(self, s):
         self.append(s)
+
+class SymbolTable(dict):
+    # Interns symbol names into small integer ids, the grammar and the corpus share a table to compare ids
+    def __init__(self):
+        super().__init__()
+        self.names = []
+
+    @staticmethod
+    def default():
+        return _default_symbol_table
+
+    def intern(self, name):
+        symbol_id = self.get(name)
+        if symbol_id is None:
+            symbol_id = len(self.names)
+            self[name] = symbol_id
+            self.names.append(name)
+        return symbol_id
+
+    def find_id(self, name):
+        return self.get(name)
+
+    def find_name(self, symbol_id):
+        return self.names[symbol_id]
+
+_default_symbol_table = SymbolTable()
@@ -0,0 +1,324 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import math
+import random
+from antlr4 import TerminalNode
+from .antlr import ANTLRv4Parser
+from .literal import unquote, char_set
+
+class Synthesizer:
+    # Negated sets and '.' are drawn from the printable ASCII characters
+    ALPHABET = frozenset(range(0x20, 0x7F))
+    MAX_TABLE_SIZE = 1024
+    MAX_REPETITION = 8
+    # Nesting of the recursive lexer rules, the deeper ones take their shortest alternatives
+    MAX_DEPTH = 4
+
+    def __init__(self, grammar = None, seed = None, max_repetition = MAX_REPETITION, max_depth = MAX_DEPTH):
+        self.grammar = grammar
+        self.random = random.Random(seed)
+        self.max_repetition = max_repetition
+        self.max_depth = max_depth
+        self.rules = {}
+        self.generators = {}
+        self.costs = None
+        self.recursive_names = None
+        if grammar is not None:
+            self.set_grammar(grammar)
+
+    def set_grammar(self, grammar):
+        self.grammar = grammar
+        self.rules = {}
+        self.generators = {}
+        self.costs = None
+        self.recursive_names = None
+        for rule in grammar.lexer_rules():
+            self.rules[rule.symbol()] = rule
+
+    def invalidate(self, names):
+        # Drops the compiled generators of the changed rules and of the reparsed ones, the others keep their tables
+        old_rules = self.rules
+        self.rules = {}
+        self.costs = None
+        self.recursive_names = None
+        for rule in self.grammar.lexer_rules():
+            self.rules[rule.symbol()] = rule
+        replaced_names = set(names)
+        for name, rule in old_rules.items():
+            if name not in self.rules or self.rules[name].node is not rule.node:
+                replaced_names.add(name)
+        # The generators of the referring rules hold the dropped generators
+        for name in self.grammar.dependents(replaced_names):
+            self.generators.pop(name, None)
+
+    def seed(self, seed):
+        self.random.seed(seed)
+
+    def has_symbol(self, name):
+        return name in self.rules
+
+    def generate(self, name):
+        return self.find_generator(name)(self.random, 0)
+
+    def find_generator(self, name):
+        gen = self.generators.get(name)
+        if gen is not None:
+            return gen
+        rule = self.rules.get(name)
+        if rule is None:
+            raise Synthesizer.Error('Lexer rule (%s) is not found' % name)
+        # Registers a forwarder first to compile recursive lexer rules
+        self.generators[name] = lambda r, depth: self.generators[name](r, depth)
+        self._rule_costs()
+        gen = self._compile_alts(rule.alternatives())
+        self.generators[name] = gen
+        return gen
+
+    def _compile_alts(self, alts):
+        gens = []
+        for alt in alts:
+            gens.append(self._compile_alt(alt))
+        if len(gens) == 1:
+            return gens[0]
+        gen_cnt = len(gens)
+        max_depth = self.max_depth
+        # Beyond max_depth the alternative of the shortest derivation is taken, it never recurses deeper
+        costs = [self._alt_cost(alt) for alt in alts]
+        shortest_gen = gens[costs.index(min(costs))]
+        def generate_alt(r, depth):
+            if max_depth <= depth:
+                return shortest_gen(r, depth)
+            return gens[int(r.random() * gen_cnt)](r, depth)
+        return generate_alt
+
+    def _compile_alt(self, alt:ANTLRv4Parser.LexerAltContext):
+        elems = alt.lexerElements()
+        if elems is None:
+            return Synthesizer._literal('')
+        gens = []
+        for elem in elems.lexerElement():
+            gen = self._compile_element(elem)
+            if gen is not None:
+                gens.append(gen)
+        if len(gens) == 0:
+            return Synthesizer._literal('')
+        if len(gens) == 1:
+            return gens[0]
+        def generate_seq(r, depth):
+            return ''.join([gen(r, depth) for gen in gens])
+        return generate_seq
+
+    def _compile_element(self, elem:ANTLRv4Parser.LexerElementContext):
+        if elem.actionBlock():
+            return None
+        gen = None
+        if elem.labeledLexerElement():
+            labeled = elem.labeledLexerElement()
+            if labeled.lexerAtom():
+                gen = self._compile_atom(labeled.lexerAtom())
+            else:
+                gen = self._compile_alts(labeled.lexerBlock().lexerAltList().lexerAlt())
+        elif elem.lexerAtom():
+            gen = self._compile_atom(elem.lexerAtom())
+        elif elem.lexerBlock():
+            gen = self._compile_alts(elem.lexerBlock().lexerAltList().lexerAlt())
+        if gen is None:
+            return None
+        if elem.ebnfSuffix():
+            gen = self._compile_repetition(gen, elem.ebnfSuffix().getText())
+        return gen
+
+    def _compile_repetition(self, gen, suffix):
+        min_rep = 0
+        max_rep = 1
+        if suffix.startswith('*'):
+            max_rep = self.max_repetition
+        elif suffix.startswith('+'):
+            min_rep = 1
+            max_rep = self.max_repetition
+        max_depth = self.max_depth
+        def generate_rep(r, depth):
+            if max_depth <= depth:
+                return ''.join([gen(r, depth) for _ in range(min_rep)])
+            return ''.join([gen(r, depth) for _ in range(r.randint(min_rep, max_rep))])
+        return generate_rep
+
+    def _compile_atom(self, atom:ANTLRv4Parser.LexerAtomContext):
+        if atom.terminal():
+            term = atom.terminal()
+            if term.STRING_LITERAL():
+                return Synthesizer._literal(unquote(term.STRING_LITERAL().getText()))
+            name = term.TOKEN_REF().getText()
+            if name not in self.rules:
+                raise Synthesizer.Error('Lexer rule (%s) is not found' % name)
+            # Only the references of the recursive rules nest deeper
+            if name in self._recursive_names():
+                return lambda r, depth: self.find_generator(name)(r, depth + 1)
+            return lambda r, depth: self.find_generator(name)(r, depth)
+        if atom.notSet():
+            return self._compile_table(Synthesizer.ALPHABET - self._not_set_codes(atom.notSet()))
+        if atom.DOT():
+            return self._compile_table(Synthesizer.ALPHABET)
+        return self._compile_table(self._set_codes(atom))
+
+    def _compile_table(self, codes):
+        if len(codes) <= 0:
+            raise Synthesizer.Error('Lexer set has no characters')
+        if Synthesizer.MAX_TABLE_SIZE < len(codes):
+            printable_codes = codes & Synthesizer.ALPHABET
+            if 0 < len(printable_codes):
+                codes = printable_codes
+            else:
+                codes = sorted(codes)[:Synthesizer.MAX_TABLE_SIZE]
+        table = ''.join([chr(code) for code in sorted(codes)])
+        table_len = len(table)
+        if table_len == 1:
+            return Synthesizer._literal(table)
+        def generate_char(r, depth):
+            return table[int(r.random() * table_len)]
+        return generate_char
+
+    def _not_set_codes(self, not_set:ANTLRv4Parser.NotSetContext):
+        if not_set.setElement():
+            return self._set_codes(not_set.setElement())
+        codes = set()
+        for set_elem in not_set.blockSet().setElement():
+            codes |= self._set_codes(set_elem)
+        return codes
+
+    def _set_codes(self, node):
+        # node is a LexerAtomContext or a SetElementContext
+        if node.LEXER_CHAR_SET():
+            return char_set(node.LEXER_CHAR_SET().getText())
+        if node.characterRange():
+            literals = node.characterRange().STRING_LITERAL()
+            return set(range(ord(unquote(literals[0].getText())), ord(unquote(literals[1].getText())) + 1))
+        if isinstance(node, ANTLRv4Parser.SetElementContext):
+            if node.STRING_LITERAL():
+                return set([ord(c) for c in unquote(node.STRING_LITERAL().getText())])
+            return self._rule_codes(node.TOKEN_REF().getText())
+        raise Synthesizer.Error('Lexer atom (%s) is not a set' % node.getText())
+
+    def _rule_codes(self, name):
+        # Resolves a set-like rule such as "fragment DIGIT : [0-9] ;" into its characters
+        rule = self.rules.get(name)
+        if rule is None:
+            raise Synthesizer.Error('Lexer rule (%s) is not found' % name)
+        codes = set()
+        for alt in rule.alternatives():
+            elems = alt.lexerElements().lexerElement() if alt.lexerElements() else []
+            if len(elems) != 1 or elems[0].ebnfSuffix() or not elems[0].lexerAtom():
+                raise Synthesizer.Error('Lexer rule (%s) is not a set' % name)
+            atom = elems[0].lexerAtom()
+            if atom.terminal() and atom.terminal().TOKEN_REF():
+                codes |= self._rule_codes(atom.terminal().TOKEN_REF().getText())
+            elif atom.terminal():
+                literal = unquote(atom.terminal().STRING_LITERAL().getText())
+                if len(literal) != 1:
+                    raise Synthesizer.Error('Lexer rule (%s) is not a set' % name)
+                codes.add(ord(literal))
+            elif atom.notSet():
+                codes |= Synthesizer.ALPHABET - self._not_set_codes(atom.notSet())
+            else:
+                codes |= self._set_codes(atom)
+        return codes
+
+    def _recursive_names(self):
+        # The lexer rules reachable from themselves
+        if self.recursive_names is None:
+            references = {}
+            for name, rule in self.rules.items():
+                references[name] = Synthesizer._rule_references(rule.node.lexerRuleBlock())
+            self.recursive_names = set()
+            for name in self.rules:
+                names = list(references[name])
+                visited = set()
+                while names:
+                    reference = names.pop()
+                    if reference == name:
+                        self.recursive_names.add(name)
+                        break
+                    if reference in visited or reference not in references:
+                        continue
+                    visited.add(reference)
+                    names.extend(references[reference])
+        return self.recursive_names
+
+    @staticmethod
+    def _rule_references(node):
+        # Grammar.references() leaves out the rule itself, the direct recursions are found here
+        references = set()
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, TerminalNode):
+                if node.symbol.type == ANTLRv4Parser.TOKEN_REF:
+                    references.add(node.getText())
+                continue
+            if node.children:
+                nodes.extend(node.children)
+        return references
+
+    def _rule_costs(self):
+        # The lengths of the shortest derivations of the lexer rules, relaxed until they converge
+        if self.costs is None:
+            self.costs = {}
+            is_changed = True
+            while is_changed:
+                is_changed = False
+                for name, rule in self.rules.items():
+                    cost = min([self._alt_cost(alt) for alt in rule.alternatives()])
+                    if cost < self.costs.get(name, math.inf):
+                        self.costs[name] = cost
+                        is_changed = True
+        return self.costs
+
+    def _alt_cost(self, alt:ANTLRv4Parser.LexerAltContext):
+        if alt.lexerElements() is None:
+            return 0
+        cost = 0
+        for elem in alt.lexerElements().lexerElement():
+            cost += self._element_cost(elem)
+        return cost
+
+    def _element_cost(self, elem:ANTLRv4Parser.LexerElementContext):
+        if elem.actionBlock():
+            return 0
+        if elem.ebnfSuffix() and elem.ebnfSuffix().getText()[0] in '?*':
+            return 0
+        alts = None
+        atom = elem.lexerAtom()
+        if elem.labeledLexerElement():
+            atom = elem.labeledLexerElement().lexerAtom()
+            if atom is None:
+                alts = elem.labeledLexerElement().lexerBlock().lexerAltList().lexerAlt()
+        elif elem.lexerBlock():
+            alts = elem.lexerBlock().lexerAltList().lexerAlt()
+        if alts is not None:
+            return min([self._alt_cost(alt) for alt in alts])
+        if atom is not None and atom.terminal() and atom.terminal().TOKEN_REF():
+            # The costs in progress are infinite until a derivation of the rule is found
+            costs = self.costs if self.costs is not None else {}
+            return costs.get(atom.terminal().TOKEN_REF().getText(), math.inf)
+        return 1
+
+    @staticmethod
+    def _literal(text):
+        return lambda r, depth: text
+
+    class Error(Exception):
+        def __init__(self, msg):
+            self.message = msg
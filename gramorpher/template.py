@@ -0,0 +1,100 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from __future__ import absolute_import
+import weakref
+from .symbols import SymbolTable
+
+class Template:
+    def __init__(self, chunks, slots, byte_chunks = None):
+        # chunks has one more literal than slots, chunks[n] precedes slots[n].
+        # byte_chunks are the encoded chunks to render into a buffer without building the text.
+        self.chunks = chunks
+        self.slots = slots
+        self.byte_chunks = byte_chunks if byte_chunks is not None else [chunk.encode('utf-8') for chunk in chunks]
+        self.slot_chunks = list(zip(slots, self.byte_chunks[1:]))
+        escaped_chunks = [chunk.replace('{', '{{').replace('}', '}}') for chunk in chunks]
+        self.format = '{}'.join(escaped_chunks)
+
+    def has_slots(self):
+        if len(self.slots) <= 0:
+            return False
+        return True
+
+    def fill(self, values):
+        return self.format.format(*values)
+
+    def bind(self, generator, case = None):
+        symbol_value = generator.symbol_value
+        return self.format.format(*[symbol_value(name, case) for name in self.slots])
+
+    def bind_into(self, buffer, generator, case = None, encoding = 'utf-8'):
+        # Appends the chunks and the encoded slot values to the bytearray
+        symbol_value = generator.symbol_value
+        buffer += self.byte_chunks[0]
+        for name, chunk in self.slot_chunks:
+            buffer += symbol_value(name, case).encode(encoding)
+            buffer += chunk
+
+    @staticmethod
+    def shape(rule):
+        # Returns a flat preorder key of the derivation, two derivations with the same key render alike
+        key = []
+        nodes = [rule]
+        while nodes:
+            node = nodes.pop()
+            children = node.children
+            key.append((node.symbol_id, len(children), node.is_expanded()))
+            if children:
+                nodes.extend(reversed(children))
+        return tuple(key)
+
+class TemplateCache:
+    def __init__(self, symbol_table = None):
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable.default()
+        self.shapes = {}
+        self.derivations = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def find(self, rule):
+        template = self.derivations.get(rule)
+        if template is not None:
+            return template
+        template = self.shapes.get(Template.shape(rule))
+        if template is not None:
+            self.derivations[rule] = template
+        return template
+
+    def add(self, rule, template):
+        self.shapes[Template.shape(rule)] = template
+        self.derivations[rule] = template
+
+    def invalidate(self, names):
+        symbol_ids = set([self.symbol_table.find_id(name) for name in names])
+        for shape in list(self.shapes.keys()):
+            for symbol_id, _, _ in shape:
+                if symbol_id in symbol_ids:
+                    del self.shapes[shape]
+                    break
+        templates = set([id(template) for template in self.shapes.values()])
+        for rule, template in list(self.derivations.items()):
+            if id(template) not in templates:
+                del self.derivations[rule]
+
+    def clear(self):
+        self.shapes.clear()
+        self.derivations.clear()
@@ -28,6 +28,9 @@ setup(
     install_requires=[
         'setuptools',
     ],
+    extras_require={
+        'zstd': ['zstandard'],
+    },
     entry_points={
         'console_scripts': [
             'gramorpher = gramorpher.executor:main'
@@ -0,0 +1,10 @@
+/*
+ * CSV.g4 split into a parser grammar and a lexer grammar
+ */
+
+lexer grammar CSVLexer;
+
+import CSVLiteral;
+
+TEXT   : ~[,\n\r"]+ ;
+STRING : '"' ('""'|~'"')* '"' ; // quote-quote is an escaped quote
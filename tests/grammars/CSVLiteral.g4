@@ -0,0 +1,9 @@
+/*
+ * Literal tokens of CSVLexer.g4
+ */
+
+lexer grammar CSVLiteral;
+
+COMMA : ',' ;
+CR    : '\r' ;
+LF    : '\n' ;
@@ -0,0 +1,18 @@
+/*
+ * CSV.g4 split into a parser grammar and a lexer grammar
+ */
+
+parser grammar CSVParser;
+
+options { tokenVocab = CSVLexer; }
+
+csvFile: hdr row+ ;
+hdr : row ;
+
+row : field (COMMA field)* CR? LF ;
+
+field
+    : TEXT
+    | STRING
+    |
+    ;
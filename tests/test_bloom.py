@@ -0,0 +1,84 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import pytest
+from gramorpher import Generator, PictCorpus, BloomFilter
+from gramorpher.executor import main
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_bloom_filter():
+    dedup = BloomFilter(0.01, 1000)
+    assert dedup.add('abc')
+    assert not dedup.add('abc')
+    assert not dedup.add(b'abc')
+    assert 'abc' in dedup
+    assert len(dedup) == 1
+    assert dedup.duplicate_count == 2
+    with pytest.raises(BloomFilter.Error):
+        BloomFilter(1.5)
+
+def test_bloom_filter_scaling():
+    dedup = BloomFilter(0.01, 1000)
+    item_cnt = 10000
+    false_positive_cnt = 0
+    for n in range(item_cnt):
+        if not dedup.add('case%d' % n):
+            false_positive_cnt += 1
+    # The slices grow to keep the total false positive rate under the error rate
+    assert 1 < len(dedup.slices)
+    assert false_positive_cnt < item_cnt * 0.01
+    for n in range(item_cnt):
+        assert 'case%d' % n in dedup
+
+def test_bloom_filter_memory():
+    dedup = BloomFilter(0.01, 100, max_memory=1024)
+    for n in range(1000):
+        dedup.add('case%d' % n)
+    assert dedup.is_saturated
+    assert dedup.memory() <= 1024
+    # The saturated filter drops more unique cases but never passes a duplicate
+    for n in range(1000):
+        assert not dedup.add('case%d' % n)
+
+def test_bloom_filter_iter_cases():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    cases = list(generator.iter_cases('row', 20))
+    unique_cases = list(generator.iter_cases('row', 20, dedup=BloomFilter()))
+    assert len(unique_cases) == len(set(cases))
+    assert unique_cases == list(dict.fromkeys(cases))
+
+def test_bloom_filter_executor(tmp_path, capsys):
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    corpus_file = get_test_corpus_file_path('CSV.pict')
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(grammar_file)
+    assert generator.parse_corpus_file(corpus_file)
+    # The batch of 48 cases cycles its plan, so the repeated texts are dropped
+    unique_texts = list(dict.fromkeys(generator.iter_cases('row', 48, seed='1', batch_size=48)))
+    assert len(unique_texts) < 48
+    outputs = []
+    for jobs in ['1', '2']:
+        out_file = os.path.join(str(tmp_path), 'cases%s.txt' % jobs)
+        assert main(['generate', grammar_file, 'row', '-c', corpus_file, '-n', '48', '-b', '48', '-s', '1', '-j', jobs, '-o', out_file, '--dedup']) == 0
+        err = capsys.readouterr().err
+        assert err.startswith('%d cases ' % len(unique_texts))
+        assert '%d duplicates dropped' % (48 - len(unique_texts)) in err
+        with open(out_file, newline='') as file:
+            outputs.append(file.read())
+    assert outputs[0] == outputs[1]
+    assert outputs[0] == ''.join([text + '\n' for text in unique_texts])
@@ -0,0 +1,74 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from gramorpher import Generator, PictCorpus, Derivation, DerivationTable
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def csv_generator():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    return generator
+
+def test_derivation_sharing():
+    generator = csv_generator()
+    rule = generator.generate('row')
+    derivation = generator.derive(rule)
+    assert derivation.name == 'row'
+    assert derivation.symbol_id == rule.symbol_id
+    # The same derivation is interned into the same node
+    assert generator.derive(generator.generate('row')) is derivation
+    # The row is "TEXT,STRING,TEXT\n", the first field and the field of the second repetition are one node
+    field = derivation.children[0]
+    block = derivation.children[2]
+    assert block.is_blockcontext() and block.rep == '*'
+    assert block.children[1] is field
+    assert derivation.children[1].children[1] is not field
+    assert len(derivation.nodes()) < derivation.size
+
+def test_derivation_render():
+    generator = csv_generator()
+    rule = generator.generate('row')
+    derivation = generator.derive(rule)
+    for case in generator.corpus.cases:
+        assert generator.render(derivation, case) == generator.render(rule, case)
+
+def test_derivation_plan():
+    generator = csv_generator()
+    items = generator.plan_cases('row')
+    derivations = []
+    for derivation, case in items:
+        assert isinstance(derivation, Derivation)
+        if derivation not in derivations:
+            derivations.append(derivation)
+    # The 8 seeds derive 8 distinct rows, each planned with the distinct corpus values of its slots
+    assert len(derivations) == Generator.DERIVATION_COUNT
+    assert len(items) == 24
+    assert len(set([generator.renderer.template(derivation) for derivation in derivations])) == len(derivations)
+    assert generator.plan_cases('row')[0][0] is items[0][0]
+
+def test_derivation_table():
+    table = DerivationTable()
+    leaf = table.intern(0, 'a', flags=Derivation.TERMINAL)
+    assert leaf.is_terminal() and leaf.is_leaf()
+    assert table.intern(0, 'a', flags=Derivation.TERMINAL) is leaf
+    other = table.intern(0, 'a')
+    assert other is not leaf
+    node = table.intern(1, 'b', '?', 0, [leaf, leaf])
+    assert node.size == 3
+    assert node.has_repetition()
+    assert len(table) == 3
+    del node
+    # The nodes no derivation refers are released
+    assert len(table) == 2
@@ -0,0 +1,53 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+from gramorpher import Grammar, Generator, Enumerator
+from .test import get_test_grammar_file_path
+
+def test_enumerator_sentences():
+    grammar = Grammar()
+    assert grammar.parse_file(get_test_grammar_file_path('CSV.g4'))
+    enumerator = Enumerator(grammar, 4)
+    sentences = list(enumerator.enumerate('row'))
+    # field is TEXT, STRING or empty, the block of (',' field)* takes a level too
+    assert sentences[:6] == [
+        ('TEXT', "'\\n'"),
+        ('TEXT', "'\\r'", "'\\n'"),
+        ('STRING', "'\\n'"),
+        ('STRING', "'\\r'", "'\\n'"),
+        ("'\\n'",),
+        ("'\\r'", "'\\n'"),
+    ]
+    assert len(sentences) == len(set(sentences))
+    assert ('TEXT', "','", 'STRING', "'\\n'") in sentences
+    assert len(list(enumerator.enumerate('row', 4))) == 4
+    with pytest.raises(Enumerator.Error):
+        list(enumerator.enumerate('unknown'))
+
+def test_enumerator_spill(tmp_path):
+    grammar = Grammar()
+    assert grammar.parse_file(get_test_grammar_file_path('CSV.g4'))
+    sentences = list(Enumerator(grammar, 5).enumerate('csvFile'))
+    enumerator = Enumerator(grammar, 5, 4096, str(tmp_path), 16)
+    assert list(enumerator.enumerate('csvFile')) == sentences
+    assert 0 < enumerator.frontier.spilled_count
+
+def test_enumerator_generator():
+    generator = Generator()
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    cases = list(generator.enumerate('row', 6, 3))
+    assert len(cases) == 6
+    assert cases[4:] == ['\n', '\r\n']
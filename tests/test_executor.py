@@ -0,0 +1,106 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import asyncio
+import threading
+from gramorpher.executor import main, generate, aiter_cases
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_executor_generate(tmp_path, capsys):
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    corpus_file = get_test_corpus_file_path('CSV.pict')
+    out_file = os.path.join(str(tmp_path), 'cases.txt')
+    assert main(['generate', grammar_file, 'row', '-c', corpus_file, '-n', '10', '-b', '3', '-o', out_file]) == 0
+    assert 'cases/sec' in capsys.readouterr().err
+    with open(out_file, newline='') as file:
+        cases = file.read().split('\n\n')
+    assert len(cases) == 11
+    assert cases[0] == 'abc,abc\r'
+
+def test_executor_generate_seeds(tmp_path):
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    corpus_file = get_test_corpus_file_path('CSV.pict')
+    outputs = []
+    for seed in ['1', '99']:
+        out_file = os.path.join(str(tmp_path), 'cases%s.txt' % seed)
+        assert main(['generate', grammar_file, 'row', '-c', corpus_file, '-n', '2000', '-b', '100', '-s', seed, '-o', out_file]) == 0
+        with open(out_file, newline='') as file:
+            outputs.append(file.read())
+    # The seed changes the derivations, and every batch draws new ones
+    assert outputs[0] != outputs[1]
+    assert 50 < len(set(outputs[0].split('\n\n')))
+
+def test_executor_generate_jobs(tmp_path):
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    outputs = []
+    for jobs in ['1', '2']:
+        out_file = os.path.join(str(tmp_path), 'cases%s.jsonl' % jobs)
+        assert main(['generate', grammar_file, 'row', '-n', '20', '-b', '4', '-s', '7', '-j', jobs, '-f', 'jsonl', '-o', out_file]) == 0
+        with open(out_file) as file:
+            outputs.append([json.loads(line) for line in file])
+    # The batches are seeded by their indexes, so the output is the same for any number of jobs
+    assert outputs[0] == outputs[1]
+    assert [case['index'] for case in outputs[0]] == list(range(20))
+
+def test_executor_info(capsys):
+    assert main(['info', get_test_grammar_file_path('CSV.g4')]) == 0
+    assert capsys.readouterr().out.split() == ['csvFile', 'hdr', 'row', 'field']
+    assert main(['generate', get_test_grammar_file_path('CSV.g4'), 'unknown']) == 1
+    assert main(['generate', get_test_grammar_file_path('Unknown.g4'), 'row']) == 1
+    assert 'Unknown.g4' in capsys.readouterr().err
+
+def test_executor_aiter_cases(tmp_path):
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    out_file = os.path.join(str(tmp_path), 'cases.txt')
+    generate(grammar_file, 'row', count=20, seed=3, output=out_file, batch_size=4)
+
+    async def consume(limit):
+        texts = []
+        async for text in aiter_cases(grammar_file, 'row', count=20, seed=3, jobs=2, batch_size=4):
+            texts.append(text)
+            if limit <= len(texts):
+                break
+        return texts
+
+    # The texts are the same as the output of generate() with the same seed
+    texts = asyncio.run(consume(20))
+    with open(out_file, newline='') as file:
+        assert file.read() == ''.join([text + '\n' for text in texts])
+    assert asyncio.run(consume(5)) == texts[:5]
+
+def test_executor_aiter_cases_single_job(tmp_path):
+    # A single job delegates to Generator.aiter_cases(), the texts do not depend on the number of jobs
+    grammar_file = get_test_grammar_file_path('CSV.g4')
+    corpus_file = get_test_corpus_file_path('CSV.pict')
+
+    async def consume(limit, jobs, count = 20):
+        texts = []
+        cases = aiter_cases(grammar_file, 'row', corpus_file, count=count, seed=3, jobs=jobs, batch_size=4)
+        try:
+            async for text in cases:
+                texts.append(text)
+                if limit <= len(texts):
+                    break
+        finally:
+            await cases.aclose()
+        return texts
+
+    texts = asyncio.run(consume(20, 1))
+    assert texts == asyncio.run(consume(20, 2))
+    assert len(texts) == 20
+    # The worker thread is joined when the consumer exits early
+    assert asyncio.run(consume(5, 1, 100000)) == texts[:5]
+    assert 'gramorpher-aiter-cases' not in [thread.name for thread in threading.enumerate()]
@@ -0,0 +1,79 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from gramorpher import Grammar
+from gramorpher.expander import Expander
+from .test import get_test_grammar_file_path
+
+def chain_grammar(depth):
+    rules = ['grammar Chain;']
+    for n in range(depth):
+        rules.append("r%d : 'a' r%d ;" % (n, n + 1))
+    rules.append("r%d : 'z' ;" % depth)
+    return '\n'.join(rules)
+
+def test_expander_deep_chain():
+    depth = sys.getrecursionlimit() + 500
+    grammar = Grammar()
+    assert grammar.parse_string(chain_grammar(depth))
+    root = grammar.find_rule('r0')
+    Expander(max_depth=0).add_children(root, root.elements())
+    node = root
+    level = 0
+    while node.children:
+        node = node.children[-1]
+        level += 1
+    assert level == depth + 1
+    assert node.name == "'z'"
+
+def test_expander_depth_budget():
+    grammar = Grammar()
+    assert grammar.parse_string(chain_grammar(100))
+    root = grammar.find_rule('r0')
+    expander = Expander(max_depth=10)
+    expander.add_children(root, root.elements())
+    assert expander.is_truncated
+    assert root.height == 10
+
+def test_expander_default_budget():
+    # The recursive add_children() of the contexts takes the default budgets, generate() takes its own
+    grammar = Grammar()
+    assert grammar.parse_string(chain_grammar(100))
+    root = grammar.find_rule('r0')
+    root.add_children(root.elements(), True)
+    assert root.height == Expander.MAX_DEPTH
+
+def test_expander_node_budget():
+    grammar = Grammar()
+    assert grammar.parse_file(get_test_grammar_file_path('UnQL.g4'))
+    root = grammar.find_rule('expression')
+    expander = Expander(max_depth=0, max_nodes=100)
+    expander.add_children(root, root.elements())
+    assert expander.is_truncated
+    assert len(root.descendants) == expander.node_count
+    assert expander.node_count <= 100
+
+def test_expander_nested_blocks():
+    grammar = Grammar()
+    depth = 40
+    assert grammar.parse_string("grammar Nest; r : %s'x'%s ;" % ('(' * depth, ')*' * depth))
+    elems = grammar.find_rule('r').elements()
+    node = elems[0]
+    level = 1
+    while node.children:
+        node = node.children[0]
+        level += 1
+    assert level == depth + 1
+    assert node.name == "'x'"
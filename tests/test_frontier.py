@@ -0,0 +1,65 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+from gramorpher import FrontierStore
+
+def test_frontier_memory():
+    with FrontierStore() as frontier:
+        for n in range(100):
+            frontier.push((n, n))
+        assert len(frontier) == 100
+        assert not frontier.is_spilling()
+        assert [frontier.pop() for _ in range(100)] == [(n, n) for n in range(100)]
+        assert frontier.memory() == 0
+        with pytest.raises(IndexError):
+            frontier.pop()
+
+def test_frontier_spill(tmp_path):
+    # 10 items fit in memory, the later ones are spilled in chunks of 8 items
+    with FrontierStore(10 * 100, str(tmp_path), 8, lambda item: 100) as frontier:
+        for n in range(50):
+            frontier.push(n)
+        assert frontier.is_spilling()
+        assert frontier.spilled_count == 40
+        assert len(frontier) == 50
+        assert frontier.memory() <= 10 * 100 + 8 * 100
+        items = [frontier.pop() for _ in range(20)]
+        # The pushes keep the order behind the spilled items
+        for n in range(50, 60):
+            frontier.push(n)
+        while 0 < len(frontier):
+            items.append(frontier.pop())
+        assert items == list(range(60))
+        assert not frontier.is_spilling()
+        assert 0 < frontier.max_disk_size
+    assert frontier.file is None
+
+def test_frontier_rotation(tmp_path):
+    # The chunks are never drained while the pushes keep up with the pops, the file is rotated instead
+    with FrontierStore(10 * 100, str(tmp_path), 8, lambda item: 100) as frontier:
+        for n in range(50):
+            frontier.push(n)
+        disk_size = frontier.max_disk_size
+        items = []
+        for n in range(50, 2000):
+            items.append(frontier.pop())
+            frontier.push(n)
+            assert frontier.is_spilling()
+        while 0 < len(frontier):
+            items.append(frontier.pop())
+        assert items == list(range(2000))
+        assert 0 < frontier.rotation_count
+        assert frontier.max_disk_size <= 3 * disk_size
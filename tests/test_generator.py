@@ -13,8 +13,11 @@
 # limitations under the License.
 
 import os
+import shutil
+import asyncio
+import threading
 import pytest
-from gramorpher import Generator, PictCorpus, corpus
+from gramorpher import Grammar, Generator, PictCorpus, SymbolTable, corpus
     
 from .test import get_test_grammar_file_path, get_test_corpus_file_path
 
@@ -40,3 +43,155 @@ def generator_test(grammar_file, corpus_file, rule_name):
     
 def test_csv_generator():
     generator_test('CSV.g4', 'CSV.pict', 'row')
+
+def test_csv_render():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    rule = generator.generate('row')
+    for case in generator.corpus.cases:
+        text = generator.render(rule, case)
+        assert text == '%s,%s,%s\n' % (case.find_case('TEXT'), case.find_case('STRING'), case.find_case('TEXT'))
+    assert generator.render(rule).endswith('\n')
+    # Every planned case is one row of the grammar
+    for rule, case in generator.plan_cases('row'):
+        text = generator.render(rule, case)
+        assert text.endswith('\n') and '\n' not in text[:-1]
+        assert text.rstrip('\r\n').count(',') == len(rule.children) - 2 - text.endswith('\r\n')
+
+def test_generator_grammar():
+    # An unloaded grammar is bound to the symbol table of the corpus
+    grammar = Grammar(symbol_table=SymbolTable())
+    generator = Generator(PictCorpus(), grammar)
+    assert grammar.symbol_table is generator.corpus.symbol_table
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    assert generator.render(generator.generate('row'), generator.corpus.cases[0]) == 'abc,123,abc\n'
+    # A loaded grammar is ready to synthesize the tokens
+    generator = Generator(PictCorpus(), grammar)
+    assert generator.render(generator.generate('row')).endswith('\n')
+    grammar = Grammar(symbol_table=SymbolTable())
+    assert grammar.parse_file(get_test_grammar_file_path('CSV.g4'))
+    with pytest.raises(Generator.Error):
+        Generator(PictCorpus(), grammar)
+
+def test_csv_reload_grammar(tmp_path):
+    for file_name in ['CSVParser.g4', 'CSVLexer.g4', 'CSVLiteral.g4']:
+        shutil.copy(get_test_grammar_file_path(file_name), str(tmp_path))
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(os.path.join(str(tmp_path), 'CSVParser.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    rule = generator.generate('row')
+    case = generator.corpus.cases[0]
+    assert generator.render(rule, case) == 'abc,123,abc\n'
+    assert not generator.grammar.is_modified()
+
+    literal_file = os.path.join(str(tmp_path), 'CSVLiteral.g4')
+    with open(literal_file) as file:
+        text = file.read()
+    with open(literal_file, 'w') as file:
+        file.write(text.replace("COMMA : ','", "COMMA : ';'"))
+    mtime = os.path.getmtime(literal_file) + 1
+    os.utime(literal_file, (mtime, mtime))
+    assert generator.grammar.is_modified()
+
+    parser_root = generator.grammar.root
+    names = generator.reload_grammar()
+    assert names == set(['COMMA', 'row', 'hdr', 'csvFile'])
+    assert generator.grammar.root is parser_root
+    rule = generator.generate('row')
+    assert generator.render(rule, case) == 'abc;123;abc\n'
+    assert generator.reload_grammar() == set()
+
+def test_reload_grammar_cache(tmp_path):
+    shutil.copy(get_test_grammar_file_path('UnQL.g4'), str(tmp_path))
+    grammar_file = os.path.join(str(tmp_path), 'UnQL.g4')
+    generator = Generator()
+    assert generator.parse_grammar_file(grammar_file)
+    generator.generate('select_stmt', max_nodes=200)
+    cache_size = sum([len(cache) for cache in generator.grammar.element_cache.values()])
+    for n in range(3):
+        # A comment replaces the nodes of every rule without changing any of them
+        with open(grammar_file, 'a') as file:
+            file.write('\n// %d\n' % n)
+        mtime = os.path.getmtime(grammar_file) + 1
+        os.utime(grammar_file, (mtime, mtime))
+        assert generator.reload_grammar() == set()
+        generator.generate('select_stmt', max_nodes=200)
+        assert sum([len(cache) for cache in generator.grammar.element_cache.values()]) == cache_size
+
+def open_rule_leaves(rule):
+    leaves = []
+    nodes = [rule]
+    while nodes:
+        node = nodes.pop()
+        if node.children:
+            nodes.extend(node.children)
+        elif node.is_rulespeccontext() and not node.is_expanded():
+            leaves.append(node)
+    return leaves
+
+def test_generate_budgets():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('UnQL.g4'))
+    # select_stmt is recursive through expression, the budgets cut the expansion off
+    for max_nodes in [5, 20, 50]:
+        rule = generator.generate('select_stmt', max_nodes=max_nodes)
+        assert rule.is_truncated
+        assert len(open_rule_leaves(rule)) == 0
+        assert generator.render(rule).lower().startswith('select ')
+    rule = generator.generate('select_stmt', max_nodes=0, max_depth=3)
+    assert rule.is_truncated
+    assert len(open_rule_leaves(rule)) == 0
+    rule = generator.generate('select_stmt', max_nodes=0, max_time=1e-9)
+    assert rule.is_truncated
+    assert len(open_rule_leaves(rule)) == 0
+    rule = generator.generate('show_stmt')
+    assert not rule.is_truncated
+    # The keywords are separated, the lexer of UnQL skips the whitespaces
+    assert generator.render(rule).lower().startswith('show ')
+
+def test_generate_budget_closing(tmp_path):
+    # The truncated derivations of a recursive rule are closed into sentences, here Python expressions
+    grammar_file = os.path.join(str(tmp_path), 'Expr.g4')
+    with open(grammar_file, 'w') as file:
+        file.write("grammar Expr;\nexpr : expr '+' expr | '(' expr ')' | 'x' ;\n")
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(grammar_file)
+    for seed in range(20):
+        rule = generator.generate('expr', max_nodes=4, seed=seed)
+        text = generator.render(rule)
+        assert eval(text, {'x': 1}) == text.count('x')
+
+def test_generate_eof(tmp_path):
+    # EOF is rendered as nothing instead of a slot
+    grammar_file = os.path.join(str(tmp_path), 'T.g4')
+    with open(grammar_file, 'w') as file:
+        file.write("grammar T;\ns : 'a' EOF ;\n")
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(grammar_file)
+    assert generator.render(generator.generate('s')) == 'a'
+    assert list(generator.enumerate('s', 3)) == ['a']
+
+def test_aiter_cases():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+
+    async def consume(count, limit, name = 'row', max_batches = 1):
+        texts = []
+        async for text in generator.aiter_cases(name, count, batch_size=3, max_batches=max_batches):
+            texts.append(text)
+            if limit <= len(texts):
+                break
+        return texts
+
+    assert asyncio.run(consume(20, 20)) == list(generator.iter_cases('row', 20, batch_size=3))
+    # The default is used for no batches ahead instead of waiting forever
+    assert asyncio.run(consume(20, 20, max_batches=0)) == list(generator.iter_cases('row', 20, batch_size=3))
+    # The worker thread is stopped and joined when the consumer exits early
+    assert len(asyncio.run(consume(100000, 5))) == 5
+    assert 'gramorpher-aiter-cases' not in [thread.name for thread in threading.enumerate()]
+    # The errors of the worker are raised to the consumer
+    with pytest.raises(Grammar.Error):
+        asyncio.run(consume(0, 1, 'unknown'))
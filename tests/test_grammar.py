@@ -14,8 +14,8 @@
 
 import os
 import pytest
-from gramorpher import Grammar
-from .test import get_test_grammar_file_path, get_test_grammar_file_paths
+from gramorpher import Grammar, SymbolTable
+from .test import get_test_grammar_file_path, get_test_grammar_file_paths, get_test_grammars_path
 
 def test_grammar_parse_csv():
     grammar = Grammar()
@@ -25,7 +25,105 @@ def test_grammar_parse_csv():
     assert(row)
     assert(row.is_root())
     assert(row.is_leaf())
-    
+
+def test_grammar_terminals():
+    grammar = Grammar()
+    test_grammar_file = get_test_grammar_file_path('CSV.g4')
+    assert grammar.parse_file(test_grammar_file)
+    assert grammar.find_terminal("','") == ','
+    assert grammar.find_terminal("'\\r'") == '\r'
+    assert grammar.find_terminal("'\\n'") == '\n'
+    assert grammar.terminal_bytes["'\\n'"] == b'\n'
+    assert not grammar.has_terminal('TEXT')
+
+    grammar = Grammar()
+    test_grammar_file = get_test_grammar_file_path('UnQL.g4')
+    assert grammar.parse_file(test_grammar_file)
+    assert grammar.find_terminal('SEMICOLON') == ';'
+    assert grammar.find_terminal('NOTEQ') == '!='
+    assert not grammar.has_terminal('SELECT')
+
+def test_grammar_symbol_ids():
+    grammar = Grammar(symbol_table=SymbolTable())
+    test_grammar_file = get_test_grammar_file_path('CSV.g4')
+    assert grammar.parse_file(test_grammar_file)
+    row = grammar.find_rule("row")
+    assert row.symbol_id == grammar.symbol_table.find_id('row')
+    assert grammar.symbol_table.find_name(row.symbol_id) == 'row'
+    field = row.find('field')
+    assert field.symbol_id == grammar.symbol_table.find_id('field')
+    assert row.find('unknown') is None
+    assert grammar.has_terminal_id(grammar.symbol_table.find_id("','"))
+    assert not grammar.has_terminal_id(grammar.symbol_table.find_id('TEXT'))
+    # Contexts of the same node share the interned name
+    assert grammar.find_rule("row").symbol_id == row.symbol_id
+    # The blocks are not interned into the shared table
+    names = set(grammar.symbol_table.names)
+    block = [elem for elem in row.elements(True) if elem.is_blockcontext()][0]
+    assert block.symbol_id < 0
+    assert block.name == "(','field)"
+    assert set(grammar.symbol_table.names) == names
+
+def test_grammar_shortest_completions():
+    grammar = Grammar()
+    assert grammar.parse_string("grammar E; e : e '+' t | t ; t : '(' e ')' | ID ; f : f ; ID : [a-z]+ ;")
+    completions = grammar.shortest_completions()
+    assert [template.clone(grammar).name for template in completions['e']] == ['t']
+    assert [template.clone(grammar).name for template in completions['t']] == ['ID']
+    # A rule without any finite derivation has no completion
+    assert 'f' not in completions
+    assert grammar.shortest_completions() is completions
+
+def test_grammar_element_cache():
+    grammar = Grammar()
+    test_grammar_file = get_test_grammar_file_path('CSV.g4')
+    assert grammar.parse_file(test_grammar_file)
+    row = grammar.find_rule("row")
+    assert row.has_elements()
+    elems = row.elements()
+    assert [elem.symbol() for elem in elems] == ['field', "(','field)", "'\\r'", "'\\n'"]
+    assert elems[1].repetition() == '*'
+    assert [elem.symbol() for elem in elems[1].children] == ["','", 'field']
+    # Each call clones new contexts from the cached decomposition
+    next_elems = row.elements()
+    assert all(elem is not next_elem for elem, next_elem in zip(elems, next_elems))
+    assert 'row' in grammar.element_cache
+    assert not grammar.find_rule("field").elements()[0].has_elements()
+
+def test_grammar_prediction():
+    test_grammar_file = get_test_grammar_file_path('UnQL.g4')
+    ll_grammar = Grammar(Grammar.Prediction.LL)
+    assert ll_grammar.parse_file(test_grammar_file)
+    sll_grammar = Grammar(Grammar.Prediction.SLL_LL)
+    assert sll_grammar.parse_file(test_grammar_file)
+    assert [rule.symbol() for rule in ll_grammar.rules()] == [rule.symbol() for rule in sll_grammar.rules()]
+    assert ll_grammar.root.getText() == sll_grammar.root.getText()
+
+def test_grammar_prediction_fallback():
+    # SLL bails out on the syntax error and the LL parse recovers the following rules
+    grammar = Grammar(Grammar.Prediction.SLL_LL)
+    assert grammar.parse_string("grammar T; r : 'a' ; s : 'b' 'c' ) ; t : 'c' ;")
+    assert grammar.find_rule('t')
+
+def test_grammar_parse_split_csv():
+    test_grammar_file = get_test_grammar_file_path('CSVParser.g4')
+    for jobs in [1, 2]:
+        grammar = Grammar(jobs=jobs)
+        assert grammar.parse_file(test_grammar_file)
+        assert len(grammar.roots) == 3
+        assert [rule.symbol() for rule in grammar.rules()] == ['csvFile', 'hdr', 'row', 'field']
+        assert [rule.symbol() for rule in grammar.lexer_rules()] == ['TEXT', 'STRING', 'COMMA', 'CR', 'LF']
+        assert grammar.find_terminal('COMMA') == ','
+        assert grammar.find_lexer_rule('LF')
+
+def test_grammar_import_override():
+    grammar = Grammar(lib_dirs=[get_test_grammars_path()])
+    assert grammar.parse_string("lexer grammar T; import CSVLiteral; COMMA : ';' ;")
+    assert grammar.find_terminal('COMMA') == ';'
+    assert grammar.find_terminal('LF') == '\n'
+    with pytest.raises(Grammar.Error):
+        Grammar().parse_string("lexer grammar T; import NotFound; A : 'a' ;")
+
 # def test_grammar():
 #     for test_grammar_file in get_test_grammar_file_paths():
 #         grammar = Grammar()
@@ -0,0 +1,47 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import sys
+import subprocess
+
+IMPORT_TIME_BUDGET_US = 60000
+
+def import_times(statement):
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=repo_dir, stderr=subprocess.PIPE, universal_newlines=True)
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+def test_import_time():
+    times = import_times('import gramorpher')
+    assert 'gramorpher' in times
+    assert times['gramorpher'] < IMPORT_TIME_BUDGET_US
+    assert 'gramorpher.antlr.ANTLRv4Parser' not in times
+    assert 'anytree' not in times
+
+def test_import_corpus():
+    times = import_times('from gramorpher import PictCorpus')
+    assert 'gramorpher.antlr' not in times
+    times = import_times('from gramorpher import Grammar')
+    assert 'gramorpher.antlr' in times
@@ -0,0 +1,66 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from gramorpher import Generator, PictCorpus, Instrument
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_instrument_generator(tmp_path):
+    generator = Generator(PictCorpus())
+    instrument = generator.enable_instrument()
+    assert generator.grammar.instrument is instrument
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    rule = generator.generate('row')
+    generator.generate('row')
+    for case in generator.corpus.cases:
+        generator.render(rule, case)
+
+    stats = instrument.to_dict()
+    timings = stats['timings']
+    counters = stats['counters']
+    assert timings['grammar.parse']['count'] == 1
+    assert timings['corpus.parse']['count'] == 1
+    assert timings['generator.generate']['count'] == 2
+    assert 2 <= timings['grammar.find_rule']['count']
+    assert timings['renderer.render']['count'] == len(generator.corpus.cases)
+    assert counters['generator.expansions'] == 12
+    assert counters['generator.nodes'] == 24
+    # Only the open rule and block nodes are looked up in the corpus, here every one is expanded
+    assert counters['corpus.lookups'] == 12
+    assert 0 < counters['element_cache.hits']
+    assert counters['template_cache.misses'] == 1
+    assert counters['symbol_value.corpus'] == 3 * len(generator.corpus.cases)
+
+    file_name = str(tmp_path / 'stats.json')
+    instrument.dump(file_name)
+    with open(file_name) as file:
+        assert json.load(file) == stats
+
+    generator.disable_instrument()
+    generator.generate('row')
+    assert instrument.to_dict() == stats
+    instrument.reset()
+    assert instrument.to_dict() == {'timings': {}, 'counters': {}}
+
+def test_instrument_timer():
+    instrument = Instrument()
+    with instrument.timer('stage'):
+        pass
+    with instrument.timer('stage'):
+        pass
+    instrument.count('items', 3)
+    stats = json.loads(instrument.dumps())
+    assert stats['timings']['stage']['count'] == 2
+    assert stats['counters'] == {'items': 3}
@@ -14,9 +14,10 @@
 
 import os
 import pytest
-from gramorpher import PictCorpus
+from gramorpher import PictCorpus, SymbolTable
 from .test import get_test_corpus_file_paths
 
+
 def test_corpus_symbols():
     for test_corpus_file in get_test_corpus_file_paths():
         pict = PictCorpus()
@@ -28,4 +29,13 @@ def test_corpus_symbols():
         for symbol_case in symbol_cases:
             for symbol_name in symbol_names:
                 symbol = symbol_case.find_case(symbol_name)
-                assert symbol
\ No newline at end of file
+                assert symbol
+
+
+def test_corpus_symbol_ids():
+    pict = PictCorpus(SymbolTable())
+    assert pict.parse_string('field\tTEXT\na\tb\n')
+    assert pict.has_symbol('field')
+    assert pict.has_symbol_id(pict.symbol_table.find_id('TEXT'))
+    assert not pict.has_symbol('row')
+    assert pict.symbol_table.find_name(pict.symbol_table.find_id('field')) == 'field'
@@ -0,0 +1,61 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from itertools import combinations
+from gramorpher import Generator, Planner, PictCorpus
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+PICT_CORPUS = 'A\tB\tC\n' + ''.join(['%s\t%s\t%s\n' % (a, b, c) for a in 'xyz' for b in '01' for c in 'pq'])
+
+def test_planner_projection():
+    corpus = PictCorpus()
+    assert corpus.parse_string(PICT_CORPUS)
+    planner = Planner(corpus)
+    assert planner.project(['A']) == [('x',), ('y',), ('z',)]
+    assert len(planner.project(['A', 'B'])) == 6
+    assert planner.project([]) == [()]
+    plans = planner.plan([['A'], ['B'], []])
+    assert [n for n, _ in plans] == [0, 0, 0, 1, 1, 2]
+    assert plans[3][1].find_case('B') == '0'
+    assert plans[3][1].find_case('A') is None
+
+def test_planner_pairwise():
+    corpus = PictCorpus()
+    assert corpus.parse_string(PICT_CORPUS)
+    shape_symbols = [['A', 'B', 'C'], ['A', 'C']]
+    full_plans = Planner(corpus).plan(shape_symbols)
+    assert len(full_plans) == 12 + 6
+    plans = Planner(corpus, pairwise=True).plan(shape_symbols)
+    assert len(plans) < len(full_plans)
+
+    def pairs(plans):
+        covered = set()
+        for n, case in plans:
+            items = [(None, n)] + sorted(case.items())
+            covered.update(combinations(items, 2))
+        return covered
+    assert pairs(plans) == pairs(full_plans)
+
+def test_generator_plan():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    rule = generator.generate('row')
+    assert generator.shape_symbols(rule) == ['TEXT', 'STRING']
+    plans = generator.plan([rule])
+    assert len(plans) == len(generator.corpus.cases)
+    for plan_rule, case in plans:
+        assert plan_rule is rule
+        generator.render(plan_rule, case)
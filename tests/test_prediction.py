@@ -0,0 +1,31 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+from gramorpher import Grammar, PredictionCache
+from .test import get_test_grammar_file_path
+
+def test_prediction_cache(tmp_path):
+    test_grammar_file = get_test_grammar_file_path('UnQL.g4')
+    assert PredictionCache.warm_up([test_grammar_file])
+    cache_file = os.path.join(str(tmp_path), 'dfa.pickle')
+    assert PredictionCache.save(cache_file)
+    PredictionCache.clear()
+    assert PredictionCache.load(cache_file)
+    grammar = Grammar()
+    assert grammar.parse_file(test_grammar_file)
+    ll_grammar = Grammar(Grammar.Prediction.LL)
+    assert ll_grammar.parse_file(test_grammar_file)
+    assert grammar.root.getText() == ll_grammar.root.getText()
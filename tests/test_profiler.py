@@ -0,0 +1,60 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import pstats
+import tracemalloc
+from gramorpher import Profiler
+from gramorpher.executor import main
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_profiler_files(tmp_path):
+    prefix = os.path.join(str(tmp_path), 'gen')
+    with Profiler(prefix) as profiler:
+        with profiler.stage('sum'):
+            sum([n * n for n in range(10000)])
+    assert 0 < pstats.Stats(prefix + '.pstats').total_calls
+    with open(prefix + '.collapsed') as file:
+        lines = file.read().splitlines()
+    assert 0 < len(lines)
+    for line in lines:
+        stack, value = line.rsplit(' ', 1)
+        assert 0 < len(stack)
+        assert 0 < int(value)
+    # Memory is not traced unless it is requested
+    assert profiler.memory_stats == {}
+
+def test_profiler_memory():
+    with Profiler(trace_memory=True, top=3) as profiler:
+        with profiler.stage('alloc'):
+            blocks = [bytearray(1024) for _ in range(100)]
+    assert not tracemalloc.is_tracing()
+    stats = profiler.memory_stats['alloc']
+    assert 0 < len(stats) <= 3
+    location, size, count = stats[0]
+    assert location.startswith(__file__)
+    assert 100 * 1024 <= size
+    assert 100 <= count
+    assert len(blocks) == 100
+
+def test_profiler_executor(tmp_path, capsys):
+    prefix = os.path.join(str(tmp_path), 'gen')
+    out_file = os.path.join(str(tmp_path), 'cases.txt')
+    assert main(['generate', get_test_grammar_file_path('CSV.g4'), 'row', '-c', get_test_corpus_file_path('CSV.pict'), '-n', '10', '-o', out_file, '--profile', prefix, '--trace-memory']) == 0
+    err = capsys.readouterr().err
+    assert '[load] top' in err
+    assert '[generate] top' in err
+    assert os.path.exists(prefix + '.pstats')
+    assert os.path.exists(prefix + '.collapsed')
@@ -0,0 +1,67 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+import os
+import time
+from gramorpher import Generator, PictCorpus, Progress
+from gramorpher.executor import main
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_progress_iter_cases():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    reports = []
+    # The interval 0 reports only once at the end
+    with Progress(0, reports.append) as progress:
+        cases = list(generator.iter_cases('row', 25, progress=progress))
+    assert len(cases) == 25
+    assert len(reports) == 1
+    report = reports[0]
+    assert report['cases'] == 25
+    assert 0 < report['rate']
+    assert 0 < report['depth']
+    # row and field out of csvFile, hdr, row and field
+    assert report['coverage'] == 0.5
+    assert 0 < report['rss']
+
+def test_progress_timer():
+    reports = []
+    progress = Progress(0.01, reports.append)
+    progress.start()
+    deadline = time.perf_counter() + 5.0
+    while len(reports) < 2 and time.perf_counter() < deadline:
+        progress.case_count += 1
+    progress.stop()
+    assert 3 <= len(reports)
+    assert reports[-1]['cases'] == progress.case_count
+    assert progress.thread is None
+
+def test_progress_output():
+    fp = io.StringIO()
+    progress = Progress(0, fp=fp)
+    progress.start()
+    progress.case_count += 10
+    progress.stop()
+    assert fp.getvalue().startswith('10 cases in ')
+    assert 'coverage 0.0%' in fp.getvalue()
+
+def test_progress_executor(tmp_path, capsys):
+    out_file = os.path.join(str(tmp_path), 'cases.txt')
+    assert main(['generate', get_test_grammar_file_path('CSV.g4'), 'row', '-c', get_test_corpus_file_path('CSV.pict'), '-n', '10', '-b', '3', '-o', out_file, '--progress', '60']) == 0
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[0].startswith('10 cases in ')
+    assert 'coverage 50.0%' in lines[0]
@@ -0,0 +1,82 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+from gramorpher import Generator, PictCorpus, Renderer
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def csv_generator():
+    generator = Generator(PictCorpus())
+    assert generator.parse_grammar_file(get_test_grammar_file_path('CSV.g4'))
+    assert generator.parse_corpus_file(get_test_corpus_file_path('CSV.pict'))
+    return generator
+
+def test_render_batch():
+    generator = csv_generator()
+    rule = generator.generate('row')
+    cases = generator.corpus.cases
+    renderer = Renderer(generator, separator=' ', case_separator='\n')
+    views = renderer.render_batch([(rule, case) for case in cases])
+    assert len(views) == len(cases)
+    for view, case in zip(views, cases):
+        text = bytes(view).decode()
+        assert text == renderer.render(rule, case)
+        assert text.startswith(case.find_case('TEXT') + ' ')
+    # The previous views are still alive, so the next batch gets a fresh buffer
+    next_views = renderer.render_batch([(rule, cases[0])])
+    assert bytes(next_views[0]) == bytes(views[0])
+
+def test_render_write():
+    generator = csv_generator()
+    rule = generator.generate('row')
+    cases = generator.corpus.cases
+    renderer = Renderer(generator, case_separator='\0')
+    out = io.BytesIO()
+    assert 0 < renderer.write(out, [(rule, case) for case in cases])
+    lines = out.getvalue().decode().split('\0')
+    assert lines[:-1] == [generator.render(rule, case) for case in cases]
+
+def test_render_deep_tree():
+    generator = csv_generator()
+    depth = 2000
+    root = Generator.Rule(generator.find_rule('row'))
+    node = root
+    for _ in range(depth):
+        child = Generator.Rule(generator.find_rule('row'))
+        child.parent = node
+        node = child
+    generator.generate('row').parent = node
+    text = generator.render(root, generator.corpus.cases[0])
+    assert text.endswith('abc,123,abc\n')
+
+def test_render_template():
+    generator = csv_generator()
+    renderer = Renderer(generator)
+    rule = generator.generate('row')
+    template = renderer.template(rule)
+    assert template.slots == ['TEXT', 'STRING', 'TEXT']
+    assert template.fill(['{a}', 'b', 'c']) == '{a},b,c\n'
+    # The same derivation shape shares one compiled template
+    assert renderer.template(generator.generate('row')) is template
+    assert len(renderer.templates) == 1
+    cases = generator.corpus.cases
+    assert renderer.render_cases(rule, cases) == [renderer.render(rule, case) for case in cases]
+    # The chunks are encoded once and the slot values are appended to the buffer
+    assert template.byte_chunks == [b'', b',', b',', b'\n']
+    for case in cases:
+        buffer = bytearray()
+        template.bind_into(buffer, generator, case)
+        assert bytes(buffer) == renderer.render(rule, case).encode() == renderer.render_bytes(rule, case)
+    assert Renderer(generator, encoding='utf-16-le').render_bytes(rule, cases[0]) == 'abc,123,abc\n'.encode('utf-16-le')
@@ -0,0 +1,74 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import gzip
+import json
+import pytest
+from gramorpher import Sink
+from gramorpher.executor import main
+from .test import get_test_grammar_file_path, get_test_corpus_file_path
+
+def test_sink_file(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'cases.txt')
+    with Sink(file_name) as sink:
+        assert sink.write(b'a\n') == 2
+        sink.write(memoryview(b'b\n'))
+    assert sink.file_names == [file_name]
+    assert sink.written == 4
+    with open(file_name, 'rb') as file:
+        assert file.read() == b'a\nb\n'
+    # A sink without writes creates the empty file too
+    empty_file_name = os.path.join(str(tmp_path), 'empty.txt.gz')
+    Sink(empty_file_name, 'gzip').close()
+    with gzip.open(empty_file_name) as file:
+        assert file.read() == b''
+
+def test_sink_gzip_rotation(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'cases.jsonl.gz')
+    assert Sink.find_compression(file_name) == 'gzip'
+    assert Sink.find_compression('cases.jsonl') is None
+    with Sink(file_name, 'gzip', max_bytes=10) as sink:
+        for data in [b'0123\n', b'4567\n', b'89\n', b'abcdefghijkl\n', b'm\n']:
+            sink.write(data)
+    # The batches are not split, the larger batch makes a larger file
+    assert [os.path.basename(name) for name in sink.file_names] == ['cases-00000.jsonl.gz', 'cases-00001.jsonl.gz', 'cases-00002.jsonl.gz', 'cases-00003.jsonl.gz']
+    texts = []
+    for name in sink.file_names:
+        with gzip.open(name) as file:
+            texts.append(file.read())
+    assert texts == [b'0123\n4567\n', b'89\n', b'abcdefghijkl\n', b'm\n']
+
+def test_sink_errors():
+    with pytest.raises(Sink.Error):
+        Sink('cases.txt', 'bz2')
+    with pytest.raises(Sink.Error):
+        Sink(None, max_bytes=10)
+
+def test_sink_executor(tmp_path, capsys):
+    file_name = os.path.join(str(tmp_path), 'cases.jsonl.gz')
+    assert main(['generate', get_test_grammar_file_path('CSV.g4'), 'row', '-c', get_test_corpus_file_path('CSV.pict'), '-n', '10', '-b', '3', '-s', '1', '-f', 'jsonl', '-o', file_name, '--max-bytes', '300']) == 0
+    # A batch of 3 cases is about 370 bytes, so each batch starts a new file
+    assert '4 files' in capsys.readouterr().err
+    cases = []
+    for n in range(4):
+        with gzip.open(Sink.rotated_file_name(file_name, n), 'rt') as file:
+            cases.extend([json.loads(line) for line in file])
+    assert [case['index'] for case in cases] == list(range(10))
+    assert cases[4]['seed'] == '1:1'
+    # Each batch plans its own derivations, numbered after the ones of the previous batches
+    assert cases[4]['derivation'] == 8
+    assert cases[3]['derivation'] == 8
+    assert set(cases[4]['row'].keys()) <= set(['STRING', 'TEXT'])
@@ -0,0 +1,61 @@
+# Copyright (C) 2020 Yahoo Japan Corporation. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import pytest
+from gramorpher import Grammar, Synthesizer
+from .test import get_test_grammar_file_path
+
+def synthesizer_test(grammar_file, name, pattern, count = 100):
+    grammar = Grammar()
+    assert grammar.parse_file(get_test_grammar_file_path(grammar_file))
+    synthesizer = Synthesizer(grammar, seed=1)
+    assert synthesizer.has_symbol(name)
+    regex = re.compile(pattern, re.DOTALL)
+    for _ in range(count):
+        value = synthesizer.generate(name)
+        assert regex.fullmatch(value), value
+
+def test_csv_synthesizer():
+    synthesizer_test('CSV.g4', 'TEXT', '[^,\n\r"]+')
+    synthesizer_test('CSV.g4', 'STRING', '"(""|[^"])*"')
+
+def test_hello_synthesizer():
+    synthesizer_test('Hello.g4', 'ID', '[a-z]+')
+    synthesizer_test('Hello.g4', 'WS', '[ \t\r\n]+')
+
+def test_unql_synthesizer():
+    synthesizer_test('UnQL.g4', 'SELECT', '[sS][eE][lL][eE][cC][tT]')
+    synthesizer_test('UnQL.g4', 'NUMBER', '[0-9]+')
+    synthesizer_test('UnQL.g4', 'FLOAT', r'[0-9]+\.[0-9]*([eE][+-]?[0-9]+)?|\.[0-9]+([eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+')
+    synthesizer_test('UnQL.g4', 'ID', '[a-zA-Z_/][a-zA-Z_\\-/.0-9]*')
+
+def test_synthesizer_unknown_symbol():
+    grammar = Grammar()
+    assert grammar.parse_file(get_test_grammar_file_path('CSV.g4'))
+    synthesizer = Synthesizer(grammar)
+    assert not synthesizer.has_symbol('field')
+    with pytest.raises(Synthesizer.Error):
+        synthesizer.generate('field')
+
+def test_synthesizer_recursive_rule():
+    grammar = Grammar()
+    assert grammar.parse_string("lexer grammar Nested; NESTED : '(' NESTED* ')' | 'x' ; PAIR : '[' PAIR ']' | 'y' ;")
+    for seed in range(50):
+        synthesizer = Synthesizer(grammar, seed=seed)
+        nested = synthesizer.generate('NESTED')
+        assert re.fullmatch(r'[()x]+', nested), nested
+        assert nested.count('(') == nested.count(')')
+        pair = synthesizer.generate('PAIR')
+        assert re.fullmatch(r'\[{0,%d}y\]{0,%d}' % (Synthesizer.MAX_DEPTH, Synthesizer.MAX_DEPTH), pair), pair